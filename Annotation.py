@@ -638,6 +638,8 @@ class AnnotationView:
     """View for a text annotation in draw"""
     def __init__(self, vobj, graphics_item):
         self.annotation = graphics_item
+        self.position = None
+        self.heads = [] #arrow head positions
         vobj.Proxy = self
 
     def configFeature(self, vp):
@@ -657,9 +659,36 @@ class AnnotationView:
         feature.Head = self.annotation.config["head"]
     
     def getGraphicsView(self, vp):
+        """Return graphics view of page (page is shown if it is not)."""
         page = vp.Object.getParentGroup() #feature
         page_view = page.ViewObject.Proxy
+        page_view.showPage()
         return page_view.graphics_view
+
+    def createItems(self, vp, scene):
+        """Add annotation and its arrows to page scene from feature 
+        properties."""
+        feature = vp.Object
+        self.annotation = AnnotationItem()
+        for prop in ["LeaderStyle", "Side", "HorizontalAlign", "VerticalAlign",
+                     "Head", "FontFamily", "FontSize", "FontColor", "Text",
+                     "Orientation"]:
+            self.updateData(feature, prop)
+        if self.position is not None:
+            self.annotation.setPos(*self.position)
+        scene.addItem(self.annotation)
+        for head in self.heads:
+            self.annotation.addArrow()
+            arrow = self.annotation.arrows[-1]
+            arrow.setHeadPos(QtCore.QPointF(*head))
+            scene.addItem(arrow)
+        self.annotation.setEditMode(False)
+        self.annotation.setVisible(vp.getPropertyByName("Visibility"))
+
+    def releaseItems(self, vp):
+        """Keep annotation position and drop its items (page is unloaded)."""
+        self.__getstate__()
+        self.annotation = None
     
 #    def setEdit(self, mode):
 #        #https://www.freecadweb.org/wiki/Std_Edit
@@ -669,11 +698,12 @@ class AnnotationView:
     
     def onDelete(self, vp, subname):
         """Delete the annotation itens."""
-        graphics_view = self.getGraphicsView(vp)
-        scene = graphics_view.scene()
-        scene.removeItem(self.annotation)
-        for item in self.annotation.getAllChildren():
-            scene.removeItem(item)
+        if self.annotation is not None and self.annotation.scene():
+            scene = self.annotation.scene()
+            scene.removeItem(self.annotation)
+            for item in self.annotation.getAllChildren():
+                if item.scene():
+                    scene.removeItem(item)
         FreeCADGui.Control.closeDialog() #force dialog close
         return True
     
@@ -681,7 +711,7 @@ class AnnotationView:
         """Called when double click in object in treeview."""
         graphics_view = self.getGraphicsView(vp)
         graphics_view.setActive()
-        task_dialog = AnnotationTask(getGraphicsView(), vp)
+        task_dialog = AnnotationTask(graphics_view, vp)
         FreeCADGui.Control.showDialog(task_dialog)
         return True
     
@@ -690,16 +720,23 @@ class AnnotationView:
         # https://forum.freecadweb.org/viewtopic.php?t=12139
         from pivy import coin
         vp.addDisplayMode(coin.SoGroup(), "Standard")
+        if not hasattr(self, "annotation"): #restored from document
+            self.annotation = None
+            return
         self.configFeature(vp)
     
     def onChanged(self, vp, prop):
         """Called when AnnotationView property changes"""
+        if getattr(self, "annotation", None) is None: #page is not shown
+            return
         if prop == "Visibility":
             visibility = vp.getPropertyByName("Visibility")
             self.annotation.setVisible(visibility)
                 
     def updateData(self, fp, prop):
         """Called when Annotation property changes"""
+        if getattr(self, "annotation", None) is None: #page is not shown
+            return
         if prop == "FontFamily":
             family = fp.getPropertyByName("FontFamily")
             self.annotation.setFontByName(family)
@@ -753,6 +790,22 @@ class AnnotationView:
         """Return the name of the default display mode. 
         It must be defined in getDisplayModes."""
         return "Standard"
+
+    def __getstate__(self):
+        """Save annotation and arrow heads positions."""
+        if getattr(self, "annotation", None) is not None:
+            pos = self.annotation.pos()
+            self.position = (pos.x(), pos.y())
+            self.heads = [(arrow.getHeadPos().x(), arrow.getHeadPos().y()) 
+                          for arrow in self.annotation.arrows]
+        return {"Position": self.position, "Heads": self.heads}
+
+    def __setstate__(self, state):
+        state = state or {}
+        position = state.get("Position")
+        self.position = tuple(position) if position else None
+        self.heads = [tuple(head) for head in state.get("Heads", [])]
+        return None
     
         
 class AnnotationCommand:
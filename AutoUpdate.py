@@ -0,0 +1,100 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Keep pages in sync with the model (PageView AutoUpdate property). Shape
+changes of projected parts are collected and, after a quiet interval, only
+orthographic projections whose shapes hash changed are projected again
+(in background by a ProjectionJob, so GUI is not blocked).
+"""
+
+from PySide import QtCore
+import FreeCAD
+
+from Orthographic import Orthographic
+from Page import closePages
+
+# Quiet interval (ms) after the last shape change before views are updated
+DEBOUNCE_INTERVAL = 500
+
+
+def orthographicFeatures(document):
+    """Return Orthographic features of document."""
+    return [obj for obj in document.Objects
+            if isinstance(getattr(obj, "Proxy", None), Orthographic)]
+
+
+def isAutoUpdated(feature):
+    """True if feature is in a page with AutoUpdate on."""
+    page = feature.getParentGroup()
+    if page is None or page.ViewObject is None:
+        return False
+    return getattr(page.ViewObject, "AutoUpdate", False)
+
+
+class ModelObserver(object):
+    """Document observer that marks projections of changed parts and
+    updates them when no change happens for DEBOUNCE_INTERVAL."""
+    def __init__(self):
+        self.changed = set() #(document name, feature name)
+        self.timer = QtCore.QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_INTERVAL)
+        self.timer.timeout.connect(self.updateViews)
+
+    def slotChangedObject(self, obj, prop):
+        if prop != "Shape":
+            return
+        for feature in orthographicFeatures(obj.Document):
+            if obj.Label in feature.Parts:
+                self.changed.add((obj.Document.Name, feature.Name))
+                self.timer.start() #restart interval
+
+    def slotDeletedDocument(self, document):
+        self.changed = set(item for item in self.changed
+                           if item[0] != document.Name)
+        for feature in orthographicFeatures(document):
+            feature.Proxy.cancelProjection()
+        closePages(document)
+
+    def getFeature(self, item):
+        """Return feature of (document name, feature name) or None."""
+        try:
+            return FreeCAD.getDocument(item[0]).getObject(item[1])
+        except NameError: #document closed
+            return None
+
+    def updateViews(self):
+        """Start projecting again views of changed projections."""
+        changed, self.changed = self.changed, set()
+        for item in sorted(changed):
+            feature = self.getFeature(item)
+            if feature is None or not isAutoUpdated(feature):
+                continue
+            if feature.Proxy.isOutdated(feature):
+                feature.Proxy.startProjection(feature)
+
+
+model_observer = ModelObserver()
+FreeCAD.addDocumentObserver(model_observer)
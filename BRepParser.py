@@ -29,103 +29,381 @@ Drawing Workbench and create the correspondent BRep objects.
 """
 ## TODO LIST
 # () write methods to make ortographic projections
-# () write conversion BSpline -> Bezier
 
 # NOTE: This module should be implemented in order to have a better control
 #       over updates in model. Once you have information about all curves in
 #       FreeCAD model, you can track all updates then automatic link those
 #       to the drawing. 
 
+import io
+import mmap
+import numpy as np
+
+# Records of TShapes section (each one ends with a line ending by "*")
+SHAPE_TYPES = ("Ve", "Ed", "Wi", "Fa", "Sh", "So", "CS", "Co")
+SECTIONS = ("Locations", "Curve2ds", "Curves", "Polygon3D", 
+            "PolygonOnTriangulations", "Surfaces", "Triangulations", 
+            "TShapes")
+
+
+def iterLines(stream):
+    """Yield text lines of a file object or a mmap."""
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        if isinstance(line, bytes):
+            line = line.decode("ascii")
+        yield line
+
+
+def iterTokens(lines):
+    """Yield tokens of lines (records may be split in many lines)."""
+    for line in lines:
+        for token in line.split():
+            yield token
+
+
+def iterBRep(stream):
+    """Read a BRep from a file object or mmap line by line. Yield 
+    ("locations", count, None), ("curve", index, curve), ("vertex", shape 
+    index, [x, y, z]) and ("edge", shape index, Edge) as they are read, so 
+    only vertices (to create edges) are kept in memory. Indexes are the 
+    ones used in BRep (curves from 1, shapes from TShapes count down to 1).
+    Locations records are not read, count tells if shapes may have one."""
+    lines = iterLines(stream)
+    vertices = {}
+    for line in lines:
+        token_list = line.split()
+        if len(token_list) != 2 or not (token_list[0] in SECTIONS):
+            continue
+        # NOTE: ignore content type, version lines and Curves2ds
+        if token_list[0] == "Locations":
+            yield ("locations", int(token_list[1]), None)
+        elif token_list[0] == "Curves":
+            tokens = iterTokens(lines)
+            for index in range(1, int(token_list[1]) + 1):
+                yield ("curve", index, readCurve(tokens))
+        # NOTE: For now, ignore Polygon3D, PolygonOnTriangulations, 
+        #       Surfaces and Triangulations.    
+        elif token_list[0] == "TShapes":
+            shape_id = int(token_list[1])
+            for line in lines:
+                shape_type = line.strip()
+                if not (shape_type in SHAPE_TYPES):
+                    continue
+                record = readShape(lines)
+                if shape_type == "Ve":
+                    vertices[shape_id] = [float(v) for v in record[1].split()]
+                    yield ("vertex", shape_id, vertices[shape_id])
+                elif shape_type == "Ed":
+                    yield ("edge", shape_id, parseEdge(record, vertices))
+                # NOTE: For now, ignore Wire, Face, Shell, So, CS, Co  
+                shape_id -= 1
+                if shape_id == 0:
+                    return
+
+
+def readShape(lines):
+    """Return non empty lines of a TShapes record (until "*")."""
+    record = []
+    for line in lines:
+        if line.strip():
+            record.append(line)
+        if line.rstrip().endswith("*"):
+            break
+    return record
+
+
+def parseEdge(record, vertices):
+    """Create Edge of a TShapes edge record. vertices is a dict of vertex
+    coordinates by shape index."""
+    subshape = record[-1].split()
+    ve_index_1 = abs(int(subshape[0])) #its vertex 1 index
+    ve_index_2 = abs(int(subshape[2])) #its vertex 2 index
+    for line in record:
+        if line.strip() == "0":
+            break
+        token_list = line.split()
+        if token_list[0] == "1":
+            curve_index = int(token_list[1]) # curve index in BRep
+            location = int(token_list[2]) # curve location index (0 is none)
+            param_min = float(token_list[3]) # min value param 
+            param_max = float(token_list[4]) # max value param
+            return Edge(vertices.get(ve_index_1), vertices.get(ve_index_2), 
+                        param_min, param_max, curve_index, location)
+    return Edge(vertices.get(ve_index_1), vertices.get(ve_index_2), 0.0, 0.0)
+
+
+def textStream(BRep):
+    """Return BRep if it is a file object or a text stream of a BRep 
+    string."""
+    if hasattr(BRep, "readline"):
+        return BRep
+    return io.StringIO(BRep if not isinstance(BRep, bytes) 
+                       else BRep.decode("ascii"))
+
+
+def openBRep(filename):
+    """Yield iterBRep records of a BRep file mapped in memory."""
+    with open(filename, "rb") as brep_file:
+        data = mmap.mmap(brep_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for record in iterBRep(data):
+                yield record
+        finally:
+            data.close()
+
+
 class BRepParser:
     def __init__(self, BRep):
-        """Generate the objects from a BRep string"""
-        BRep = BRep.split("\n")
+        """Generate the objects from a BRep string or file object."""
+        BRep = textStream(BRep)
         self.curves = []
         self.vertex = {}
-        i = 0
-        while i < len(BRep):
-            # NOTE: ignore content type, version lines and Curves2ds
-            line = BRep[i].strip()
-            line = line.split()
-            if len(line) == 0:
-                i += 1
-                continue
-            if line[0] == "Curves":
-                i += 1
-                count = int(line[1])
-                self.curves.extend([createCurve(record) for record in BRep[i:i+count]])
-                i += count
-            # NOTE: For now, ignore Polygon3D, PolygonOnTriangulations, 
-            #       Surfaces and Triangulations.    
-            elif line[0] == "TShapes":
-                self.shape_id = int(line[1]) #shape number
-                i += 1
-            elif line[0] == "Ve":
-                self.vertex[self.shape_id] = map(float, BRep[i+2].split())
-                self.shape_id -= 1
-                i += 6
-            elif line[0] == "Ed":
-                i += 1
-                j = 0
-                while True:
-                    line = BRep[i+j].split()
-                    if len(line) == 0:
-                        j += 1
-                        continue
-                    if line[-1] == "*":
-                        break
-                    j += 1
-                j += 1
-                self.parseEdge(BRep[i:i+j])
-                self.shape_id -= 1
-                i += j
-            # NOTE: For now, ignore Wire, Face, Shell, So, CS, Co  
-            else: #ignore line
-                i += 1
-                
-    def parseEdge(self, representation):
-        subshape = representation[-1].split()
-        ve_index_1 = abs(int(subshape[0])) #its vertex 1 index
-        ve_index_2 = abs(int(subshape[2])) #its vertex 2 index
-        for line in representation:
-            if line.strip() == "0":
-                break
-            token_list = line.split()
-            if token_list[0] == "1":
-                curve_index = int(token_list[1]) - 1 # curve index in curves list
-                param_min = float(token_list[3]) # min value param 
-                param_max = float(token_list[4]) # max value param
-                vertex_1 = self.vertex[ve_index_1]
-                vertex_2 = self.vertex[ve_index_2]
-                edge = Edge(vertex_1, vertex_2, param_min, param_max)
-                self.curves[curve_index].setEdge(edge)
+        self.edges = {}
+        for kind, index, item in iterBRep(BRep):
+            if kind == "curve":
+                self.curves.append(item)
+            elif kind == "vertex":
+                self.vertex[index] = item
+            elif kind == "edge":
+                self.edges[index] = item
+                if item.curve_index:
+                    self.curves[item.curve_index - 1].setEdge(item)
+
+
+# Number of tokens of each curve record (after its type number)
+CURVE_SIZES = {1: 6, 2: 13, 3: 14, 4: 13, 5: 14}
+
+def readCurve(tokens):
+    """Read a curve record from an iterator of tokens and create it."""
+    curve_num = int(next(tokens))
+    if curve_num in CURVE_SIZES:
+        record = [next(tokens) for i in range(CURVE_SIZES[curve_num])]
+    elif curve_num == 6: #rational, degree, poles
+        record = [next(tokens), next(tokens)]
+        size = (int(record[1]) + 1) * (4 if record[0] == "1" else 3)
+        record.extend(next(tokens) for i in range(size))
+    elif curve_num == 7: #rational, periodic, degree, poles, knots
+        record = [next(tokens) for i in range(5)]
+        size = int(record[3]) * (4 if record[0] == "1" else 3) + int(record[4]) * 2
+        record.extend(next(tokens) for i in range(size))
+    elif curve_num == 8: #trimmed curve: u1, u2 and basis curve
+        record = [next(tokens), next(tokens)]
+        return TrimmedCurve(" ".join(record), readCurve(tokens))
+    elif curve_num == 9: #offset curve: offset, direction and basis curve
+        record = [next(tokens) for i in range(4)]
+        return OffsetCurve(" ".join(record), readCurve(tokens))
+    else:
+        raise NotImplementedError("This curve is not implement for now.")
+    return createCurve("{} {}".format(curve_num, " ".join(record)))
 
 def createCurve(record):
     """Factory to create record."""
-    curve_num = record[0]
+    curve_num = record.split()[0]
+    record = record[len(curve_num) + 1:]
     if curve_num == "1":
-        return Line(record[2:])
+        return Line(record)
     elif curve_num == "2":
-        return Circle(record[2:])
+        return Circle(record)
     elif curve_num == "3": 
-        return Ellipse(record[2:])
+        return Ellipse(record)
+    elif curve_num == "4": 
+        return Parabola(record)
+    elif curve_num == "5": 
+        return Hyperbola(record)
     elif curve_num == "6": 
-        return Bezier(record[2:])
+        return Bezier(record)
     elif curve_num == "7":
-        return BSpline(record[2:])
-    raise NotImplementedError("This curve is not implement for now.")
+        return BSpline(record)
+    return Curve3D(record)
+
+
+def deBoor(knots, poles, degree, u):
+    """Evaluate a B-spline (flat knot vector, (n, d) poles) at each value of
+    array u with de Boor algorithm. Return a (len(u), d) array."""
+    n = len(poles)
+    span = np.searchsorted(knots, u, side="right") - 1
+    span = np.clip(span, degree, n - 1)
+    points = poles[span[:, np.newaxis] + np.arange(-degree, 1)]
+    for r in range(1, degree + 1):
+        for j in range(degree, r - 1, -1):
+            left = knots[span + j - degree]
+            right = knots[span + j + 1 - r]
+            length = right - left
+            alpha = np.where(length > 0, (u - left)/np.where(length > 0, length, 1.0), 0.0)
+            alpha = alpha[:, np.newaxis]
+            points[:, j] = (1.0 - alpha)*points[:, j - 1] + alpha*points[:, j]
+    return points[:, degree]
+
+
+def homogeneous(poles, weights):
+    """Return (n, 4) array of weighted poles (x*w, y*w, z*w, w)."""
+    return np.hstack([poles*weights[:, np.newaxis], weights[:, np.newaxis]])
+
+
+# Max distance (model units) between a rational or high degree curve and its
+# cubic Bezier approximation
+BEZIER_TOLERANCE = 1e-3
+# Parameters checked in each cubic approximation and max subdivision level
+_CHECK_PARAMS = np.linspace(0.0, 1.0, 9)[1:-1]
+_MAX_SUBDIVISIONS = 12
+
+
+def insertKnot(knots, poles, degree, u):
+    """Insert knot u once (Boehm algorithm). Return new flat knots and 
+    poles ((n, d) array, weighted poles for rational curves)."""
+    span = np.searchsorted(knots, u, side="right") - 1
+    span = min(span, len(poles) - 1)
+    i = np.arange(span - degree + 1, span + 1)
+    alpha = ((u - knots[i])/(knots[i + degree] - knots[i]))[:, np.newaxis]
+    new_poles = np.empty((len(poles) + 1, poles.shape[1]))
+    new_poles[:span - degree + 1] = poles[:span - degree + 1]
+    new_poles[span - degree + 1:span + 1] = (1.0 - alpha)*poles[i - 1] + alpha*poles[i]
+    new_poles[span + 1:] = poles[span:]
+    return (np.insert(knots, span + 1, u), new_poles)
+
+
+def bezierSpans(knots, poles, degree, u_1=None, u_2=None):
+    """Split a B-spline (flat knots, (n, d) poles) into Bezier spans of same
+    degree inserting each knot in [u_1, u_2] until its multiplicity is 
+    degree. Return a (spans, degree + 1, d) array."""
+    u_1 = knots[degree] if u_1 is None else max(u_1, knots[degree])
+    u_2 = knots[len(poles)] if u_2 is None else min(u_2, knots[len(poles)])
+    breaks = np.unique(knots[(knots > u_1) & (knots < u_2)])
+    for u in np.concatenate([[u_1], breaks, [u_2]]):
+        for i in range(degree - np.count_nonzero(knots == u)):
+            knots, poles = insertKnot(knots, poles, degree, u)
+    spans = []
+    for u in np.concatenate([[u_1], breaks]):
+        span = np.searchsorted(knots, u, side="right") - 1
+        spans.append(poles[span - degree:span + 1])
+    return np.array(spans).reshape(-1, degree + 1, poles.shape[1])
+
+
+def elevateToCubic(spans):
+    """Raise (m, degree + 1, d) Bezier spans of degree 1 or 2 to cubic."""
+    degree = spans.shape[1] - 1
+    if degree == 1:
+        p_0, p_1 = spans[:, 0], spans[:, 1]
+        return np.stack([p_0, (2*p_0 + p_1)/3.0, (p_0 + 2*p_1)/3.0, p_1], axis=1)
+    if degree == 2:
+        p_0, p_1, p_2 = spans[:, 0], spans[:, 1], spans[:, 2]
+        return np.stack([p_0, p_0 + 2.0/3.0*(p_1 - p_0), 
+                         p_2 + 2.0/3.0*(p_1 - p_2), p_2], axis=1)
+    return spans
+
+
+def evaluateSpans(spans, t):
+    """Evaluate (m, degree + 1, 4) weighted Bezier spans at each value of t
+    (de Casteljau). Return a (m, len(t), 3) array."""
+    t = t[np.newaxis, :, np.newaxis, np.newaxis]
+    points = spans[:, np.newaxis]
+    while points.shape[2] > 1:
+        points = (1.0 - t)*points[:, :, :-1] + t*points[:, :, 1:]
+    points = points[:, :, 0]
+    return points[..., :3]/points[..., 3:]
+
+
+def splitSpans(spans):
+    """Split (m, degree + 1, d) Bezier spans at t = 0.5. Return (left, right)."""
+    left, right = [spans[:, 0]], [spans[:, -1]]
+    points = spans
+    while points.shape[1] > 1:
+        points = 0.5*(points[:, :-1] + points[:, 1:])
+        left.append(points[:, 0])
+        right.append(points[:, -1])
+    return (np.stack(left, axis=1), np.stack(right[::-1], axis=1))
+
+
+def hermiteCubics(spans):
+    """Cubic Bezier control points (m, 4, 3) with same end points and end 
+    tangents of (m, degree + 1, 4) weighted Bezier spans."""
+    degree = spans.shape[1] - 1
+    weights = spans[:, :, 3:]
+    poles = spans[:, :, :3]/weights
+    start, end = poles[:, 0], poles[:, -1]
+    d_start = degree*weights[:, 1]/weights[:, 0]*(poles[:, 1] - start)
+    d_end = degree*weights[:, -2]/weights[:, -1]*(end - poles[:, -2])
+    return np.stack([start, start + d_start/3.0, end - d_end/3.0, end], axis=1)
+
+
+def approximateCubics(spans, tolerance=BEZIER_TOLERANCE):
+    """Approximate (m, degree + 1, 4) weighted Bezier spans by cubic Beziers
+    within tolerance. Spans farther than tolerance of their Hermite cubic
+    (checked at a few parameters) are split in halves. Return (k, 4, 3)."""
+    cubic_t = _CHECK_PARAMS[:, np.newaxis]
+    basis = np.hstack([(1 - cubic_t)**3, 3*(1 - cubic_t)**2*cubic_t, 
+                       3*(1 - cubic_t)*cubic_t**2, cubic_t**3])
+    done = [] # (key, cubic), key orders pieces as in the curve
+    keys = np.arange(len(spans), dtype=float)
+    size = 1.0
+    for level in range(_MAX_SUBDIVISIONS + 1):
+        cubics = hermiteCubics(spans)
+        points = evaluateSpans(spans, _CHECK_PARAMS)
+        error = np.sqrt(((np.einsum("ij,mjk->mik", basis, cubics) - 
+                          points)**2).sum(axis=2)).max(axis=1)
+        ok = (error <= tolerance) | (level == _MAX_SUBDIVISIONS)
+        done.extend(zip(keys[ok], cubics[ok]))
+        if ok.all():
+            break
+        size /= 2.0
+        left, right = splitSpans(spans[~ok])
+        spans = np.concatenate([left, right])
+        keys = np.concatenate([keys[~ok], keys[~ok] + size])
+    done.sort(key=lambda item: item[0])
+    return np.array([cubic for key, cubic in done]).reshape(-1, 4, 3)
+
+
+def toCubicBeziers(knots, poles, weights, degree, u_1=None, u_2=None,
+                   tolerance=BEZIER_TOLERANCE):
+    """Cubic Bezier control points (k, 4, 3) of a B-spline in [u_1, u_2].
+    Non rational curves up to degree 3 are converted exactly, rational 
+    and higher degree ones are approximated within tolerance."""
+    rational = not np.all(weights == weights[0])
+    if rational or degree > 3:
+        spans = bezierSpans(knots, homogeneous(poles, weights), degree, u_1, u_2)
+        return approximateCubics(spans, tolerance)
+    return elevateToCubic(bezierSpans(knots, poles, degree, u_1, u_2))
 
 
 class Curve3D(object):
+    """Base 3D curve. Subclasses keep their data in NumPy arrays and 
+    evaluate(u) returns a (len(u), 3) array of points at parameters u."""
     def __init__(self, record):
         self.record = record
-        # TODO: escrever o leitor para essa funcao 
+        self.edge = None
 
     def setEdge(self, edge):
         self.edge = edge
+
+    def evaluate(self, u):
+        raise NotImplementedError("This curve is not implement for now.")
+
+    def toCubics(self, u_1=None, u_2=None, tolerance=BEZIER_TOLERANCE):
+        """Return (k, 4, 3) control points of cubic Beziers of the curve in 
+        [u_1, u_2] (default edge parameters)."""
+        raise NotImplementedError("This curve is not implement for now.")
+
+    def parameters(self, u_1, u_2):
+        """Return u_1, u_2 or edge parameters if they are None."""
+        if u_1 is None and self.edge is not None:
+            u_1 = self.edge.param_min
+        if u_2 is None and self.edge is not None:
+            u_2 = self.edge.param_max
+        return (u_1, u_2)
+
+    def sample(self, count=16):
+        """Evaluate count points equally spaced in parameters of its edge."""
+        return self.evaluate(np.linspace(self.edge.param_min, 
+                                         self.edge.param_max, count))
         
     def printEdge(self):
         print("{}".format(str(self.edge)))
+
+    def printCurve(self):
+        print("{}, {}".format(type(self).__name__, str(self.edge)))
     
     def __repr__(self):
         return "{}".format(str(self.edge))
@@ -134,9 +412,13 @@ class Curve3D(object):
 class Line(Curve3D):
     def __init__(self, record):
         super(Line, self).__init__(record)
-        token_list = record.split()
-        self.P = map(float, token_list[:3])
-        self.D = map(float, token_list[3:])
+        values = np.array(record.split(), float)
+        self.P = values[:3]
+        self.D = values[3:6]
+
+    def evaluate(self, u):
+        u = np.atleast_1d(np.asarray(u, float))
+        return self.P + u[:, np.newaxis]*self.D
         
     def printCurve(self):
         format_list = [self.P, self.D, self.edge.param_min, self.edge.param_max]
@@ -145,15 +427,35 @@ class Line(Curve3D):
     def __repr__(self):
         return "Line(P={}; D={})\n".format(self.P, self.D)
 
-class Circle(Curve3D):
+
+class Conic(Curve3D):
+    """Conic with center P, normal N and axes Dx, Dy. Subclasses give the 
+    factors of Dx and Dy (coefficients) at each parameter."""
+    def __init__(self, record):
+        super(Conic, self).__init__(record)
+        self.values = np.array(record.split(), float)
+        self.P = self.values[:3]
+        self.N = self.values[3:6]
+        self.Dx = self.values[6:9]
+        self.Dy = self.values[9:12]
+
+    def coefficients(self, u):
+        raise NotImplementedError
+
+    def evaluate(self, u):
+        u = np.atleast_1d(np.asarray(u, float))
+        x, y = self.coefficients(u)
+        return (self.P + x[:, np.newaxis]*self.Dx + 
+                y[:, np.newaxis]*self.Dy)
+
+
+class Circle(Conic):
     def __init__(self, record):
         super(Circle, self).__init__(record)
-        token_list = record.split()
-        self.P = map(float, token_list[:3])
-        self.N = map(float, token_list[3:6])
-        self.Dx = map(float, token_list[6:9])
-        self.Dy = map(float, token_list[9:12])
-        self.r = float(token_list[12]) 
+        self.r = self.values[12]
+
+    def coefficients(self, u):
+        return (self.r*np.cos(u), self.r*np.sin(u))
         
     def printCurve(self):
         list_ = [self.P, self.r, self.Dx, self.Dy, self.edge.param_min, self.edge.param_max]
@@ -163,62 +465,196 @@ class Circle(Curve3D):
         list_ = [self.P, self.N, self.Dx, self.Dy, self.r]
         return "Circle(c = {}; N = {}; Dx = {}; Dy = {}; r = {})\n".format(*list_)
 
-class Ellipse(Curve3D):
-    pass
+
+class Ellipse(Conic):
+    def __init__(self, record):
+        super(Ellipse, self).__init__(record)
+        self.r_1, self.r_2 = self.values[12:14] # major and minor radius
+
+    def coefficients(self, u):
+        return (self.r_1*np.cos(u), self.r_2*np.sin(u))
+        
+    def printCurve(self):
+        list_ = [self.P, self.r_1, self.Dx, self.r_2, self.Dy, 
+                 self.edge.param_min, self.edge.param_max]
+        print("C(u) = {} + {} cos(u) {} + {} sin(u) {}, u in [{}, {}]".format(*list_))
+        
+    def __repr__(self):
+        list_ = [self.P, self.N, self.Dx, self.Dy, self.r_1, self.r_2]
+        return "Ellipse(c = {}; N = {}; Dx = {}; Dy = {}; r1 = {}; r2 = {})\n".format(*list_)
+
+
+class Parabola(Conic):
+    def __init__(self, record):
+        super(Parabola, self).__init__(record)
+        self.focal = self.values[12]
+
+    def coefficients(self, u):
+        return (u**2/(4.0*self.focal), u)
+
+    def __repr__(self):
+        list_ = [self.P, self.N, self.Dx, self.Dy, self.focal]
+        return "Parabola(c = {}; N = {}; Dx = {}; Dy = {}; f = {})\n".format(*list_)
+
+
+class Hyperbola(Conic):
+    def __init__(self, record):
+        super(Hyperbola, self).__init__(record)
+        self.r_1, self.r_2 = self.values[12:14]
+
+    def coefficients(self, u):
+        return (self.r_1*np.cosh(u), self.r_2*np.sinh(u))
+
+    def __repr__(self):
+        list_ = [self.P, self.N, self.Dx, self.Dy, self.r_1, self.r_2]
+        return "Hyperbola(c = {}; N = {}; Dx = {}; Dy = {}; r1 = {}; r2 = {})\n".format(*list_)
+
 
 class Bezier(Curve3D):
-    pass
-#    def __init__(self, record):
-#        super(Circle, self).__init__(record)
-#        token_list = record.split()
-#        self.r = float(token_list[0])
-#        self.N = map(float, token_list[3:6])
-#        self.Dx = map(float, token_list[6:9])
-#        self.Dy = map(float, token_list[9:12])
-#        self.r = float(token_list[12]) 
-#        
-#    def printCurve(self):
-#        list_ = [self.P, self.r, self.Dx, self.Dy, self.edge.param_min, self.edge.param_max]
-#        print("C(u) = {} + {} (cos(u) {} + sin(u) {}), u in [{}, {}]".format(*list_))
-#        
-#    def __repr__(self):
-#        list_ = [self.P, self.N, self.Dx, self.Dy, self.r]
-#        return "Circle(c = {}; N = {}; Dx = {}; Dy = {}; r = {})\n".format(*list_)
+    """Bezier curve defined for u in [0, 1]. poles is a (n, 3) array and 
+    weights a (n,) array (ones if not rational)."""
+    def __init__(self, record):
+        super(Bezier, self).__init__(record)
+        token_list = record.split()
+        self.rational = token_list[0] == "1"
+        self.degree = int(token_list[1])
+        values = np.array(token_list[2:], float)
+        values = values.reshape(self.degree + 1, 4 if self.rational else 3)
+        self.poles = values[:, :3]
+        self.weights = (values[:, 3] if self.rational 
+                        else np.ones(self.degree + 1))
+
+    def evaluate(self, u):
+        """de Casteljau algorithm on weighted poles for all u at once."""
+        u = np.atleast_1d(np.asarray(u, float))[:, np.newaxis, np.newaxis]
+        points = homogeneous(self.poles, self.weights)[np.newaxis]
+        for r in range(self.degree):
+            points = (1.0 - u)*points[:, :-1] + u*points[:, 1:]
+        points = points[:, 0]
+        return points[:, :3]/points[:, 3:]
+
+    def toCubics(self, u_1=None, u_2=None, tolerance=BEZIER_TOLERANCE):
+        knots = np.repeat([0.0, 1.0], self.degree + 1)
+        u_1, u_2 = self.parameters(u_1, u_2)
+        return toCubicBeziers(knots, self.poles, self.weights, self.degree,
+                              u_1, u_2, tolerance)
+        
+    def printCurve(self):
+        list_ = [self.degree, self.poles.tolist(), self.edge.param_min, 
+                 self.edge.param_max]
+        print("Bezier(degree {}; poles {}), u in [{}, {}]".format(*list_))
+        
+    def __repr__(self):
+        list_ = [self.degree, self.poles.tolist(), self.weights.tolist()]
+        return "Bezier(degree = {}; poles = {}; weights = {})\n".format(*list_)
 
 
 class BSpline(Curve3D):
-    # TODO: It has to be converted into Bezier curves once svg can be just bezier
-    # https://math.stackexchange.com/questions/417859/convert-a-b-spline-into-bezier-curves
+    """B-spline curve. poles is a (n, 3) array, weights a (n,) array (ones
+    if not rational), knots and multiplicities are the distinct knots as 
+    written in BRep and flat_knots is the knot vector used in evaluation.
+    Periodic curves are unwrapped (first degree poles repeated at the end)."""
     def __init__(self, record):
-        super(Circle, self).__init__(record)
+        super(BSpline, self).__init__(record)
         token_list = record.split()
-        self.r = float(token_list.pop()) # rational flag
-        self.m = float(token_list.pop()) # degree
-        self.n = float(token_list.pop()) # pole count
-        self.k = float(token_list.pop()) # knot count
-        self.B = []
-        self.h = []
-        for i in range(0, len(token_list), 4):
-            self.B.append(map(float, token_list[i:i+3]))
-            self.h.append(float(token_list[i+3]))
+        self.rational = token_list[0] == "1"
+        self.periodic = token_list[1] == "1"
+        self.degree = int(token_list[2])
+        pole_count, knot_count = int(token_list[3]), int(token_list[4])
+        size = pole_count * (4 if self.rational else 3)
+        values = np.array(token_list[5:5 + size], float)
+        values = values.reshape(pole_count, 4 if self.rational else 3)
+        self.poles = values[:, :3]
+        self.weights = values[:, 3] if self.rational else np.ones(pole_count)
+        knots = np.array(token_list[5 + size:5 + size + 2*knot_count], float)
+        self.knots = knots[0::2]
+        self.multiplicities = knots[1::2].astype(int)
+        self.flat_knots = np.repeat(self.knots, self.multiplicities)
+        if self.periodic:
+            self.unwrap()
+
+    def unwrap(self):
+        """Make the periodic curve a non periodic one with same shape in 
+        [first knot, last knot]."""
+        degree = self.degree
+        period = self.knots[-1] - self.knots[0]
+        knots = self.flat_knots[:len(self.flat_knots) - self.multiplicities[-1]]
+        self.flat_knots = np.concatenate([knots[len(knots) - degree:] - period, 
+                                          knots, 
+                                          knots[:degree + 1] + period])
+        self.poles = np.vstack([self.poles, self.poles[:degree]])
+        self.weights = np.concatenate([self.weights, self.weights[:degree]])
+
+    def evaluate(self, u):
+        u = np.atleast_1d(np.asarray(u, float))
+        points = deBoor(self.flat_knots, homogeneous(self.poles, self.weights),
+                        self.degree, u)
+        return points[:, :3]/points[:, 3:]
+
+    def toCubics(self, u_1=None, u_2=None, tolerance=BEZIER_TOLERANCE):
+        u_1, u_2 = self.parameters(u_1, u_2)
+        return toCubicBeziers(self.flat_knots, self.poles, self.weights, 
+                              self.degree, u_1, u_2, tolerance)
         
     def printCurve(self):
-        list_ = [self.P, self.r, self.Dx, self.Dy, self.edge.param_min, self.edge.param_max]
-        print("C(u) = {} + {} (cos(u) {} + sin(u) {}), u in [{}, {}]".format(*list_))
+        list_ = [self.degree, len(self.poles), self.knots.tolist(), 
+                 self.edge.param_min, self.edge.param_max]
+        print("BSpline(degree {}; {} poles; knots {}), u in [{}, {}]".format(*list_))
         
     def __repr__(self):
-        list_ = [self.P, self.N, self.Dx, self.Dy, self.r]
-        return "Circle(c = {}; N = {}; Dx = {}; Dy = {}; r = {})\n".format(*list_)
+        list_ = [self.degree, self.poles.tolist(), self.weights.tolist(), 
+                 self.knots.tolist(), self.multiplicities.tolist()]
+        return "BSpline(degree = {}; poles = {}; weights = {}; " \
+               "knots = {}; multiplicities = {})\n".format(*list_)
+
+
+class TrimmedCurve(Curve3D):
+    def __init__(self, record, basis):
+        super(TrimmedCurve, self).__init__(record)
+        self.u_1, self.u_2 = [float(v) for v in record.split()]
+        self.basis = basis
+
+    def evaluate(self, u):
+        return self.basis.evaluate(u)
+
+    def toCubics(self, u_1=None, u_2=None, tolerance=BEZIER_TOLERANCE):
+        u_1, u_2 = self.parameters(u_1, u_2)
+        u_1 = self.u_1 if u_1 is None else max(u_1, self.u_1)
+        u_2 = self.u_2 if u_2 is None else min(u_2, self.u_2)
+        return self.basis.toCubics(u_1, u_2, tolerance)
+
+
+class OffsetCurve(Curve3D):
+    # Parameter step of tangent central differences 
+    STEP = 1e-6
+
+    def __init__(self, record, basis):
+        super(OffsetCurve, self).__init__(record)
+        values = np.array(record.split(), float)
+        self.offset = values[0]
+        self.D = values[1:4]
+        self.basis = basis
 
+    def evaluate(self, u):
+        """Basis points moved by offset along tangent x D."""
+        u = np.atleast_1d(np.asarray(u, float))
+        tangent = (self.basis.evaluate(u + self.STEP) - 
+                   self.basis.evaluate(u - self.STEP))
+        normal = np.cross(tangent, self.D)
+        length = np.sqrt((normal**2).sum(axis=1))[:, np.newaxis]
+        length[length == 0] = 1.0
+        return self.basis.evaluate(u) + self.offset*normal/length
 
 
- 
 class Edge:
-    def __init__(self, vertex_1, vertex_2, param_min, param_max):
+    def __init__(self, vertex_1, vertex_2, param_min, param_max, 
+                 curve_index=None, location=0):
         self.vertex_1 = vertex_1
         self.vertex_2 = vertex_2
         self.param_min = param_min
         self.param_max = param_max
+        self.curve_index = curve_index #index of its 3D curve in BRep
+        self.location = location #index of its curve location in BRep
                     
     def __repr__(self):
         return "Edge({}, {}), ".format(self.vertex_1, self.vertex_2) + \
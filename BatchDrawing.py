@@ -0,0 +1,324 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Headless drawing generation. Views of FreeCAD documents are projected and
+written over a template as svg files, without FreeCAD GUI or Qt widgets.
+Documents are processed in parallel worker processes:
+    python BatchDrawing.py --spec views.json --template A3.svg \
+        --output drawings part_1.FCStd part_2.FCStd ...
+FreeCAD lib directory must be in PYTHONPATH (or given by --freecad-lib).
+
+View specification (json), all keys are optional:
+    {"parts": ["Body", "Pad"],        labels, default all top level shapes
+     "plane": "XY", "direction": [0, 0, -1], "mode": "Parts",
+     "views": ["Front", "Top", "Right"] or {"Front": [x, y], ...} (view
+              centers in millimiters, default third angle layout),
+     "scale": 1.0, "show_hidden": false, "show_smooth": false,
+     "fields": {"title": "..."}}      editable texts of the template
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+from PathGeometry import VISIBLE, HIDDEN
+from TemplateCache import readTemplateInfo
+
+DEFAULT_SPEC = {"parts": None, "plane": "XY", "direction": (0, 0, -1),
+                "mode": "Parts", "views": ["Front", "Top", "Right"], 
+                "scale": 1.0, "show_hidden": False, "show_smooth": False,
+                "fields": {}}
+# Space (millimiters) between views in automatic layout
+VIEW_GAP = 10.0
+# Line styles by edge class (widths in millimiters on page)
+LINE_STYLES = {VISIBLE: "stroke:#000000;stroke-width:{width};fill:none",
+               HIDDEN: "stroke:#000000;stroke-width:{width};fill:none;"
+                       "stroke-dasharray:{dash}"}
+LINE_WIDTHS = {VISIBLE: 0.35, HIDDEN: 0.25}
+HIDDEN_DASH = (2.0, 1.0)
+
+
+def readSpec(filename=None):
+    """Return view specification of a json file with default values."""
+    spec = dict(DEFAULT_SPEC)
+    if filename:
+        with open(filename, "r") as spec_file:
+            spec.update(json.load(spec_file))
+    return spec
+
+
+def svgElements(geometry):
+    """Return svg elements (strings) of a PathGeometry. Segments of each 
+    edge class are joined in a single path while they are connected."""
+    elements = []
+    data = []
+    end = None
+    for path_type, edge_class, start, values in geometry.iterSegments():
+        if path_type == "circle":
+            elements.append("<circle cx=\"{}\" cy=\"{}\" r=\"{}\" />".format(
+                values[0][0], values[0][1], values[1]))
+            continue
+        if path_type == "ellipse":
+            center, r_x, r_y, rotation, pivot = values
+            elements.append("<ellipse cx=\"{}\" cy=\"{}\" rx=\"{}\" ry=\"{}\" "
+                            "transform=\"rotate({} {} {})\" />".format(
+                                center[0], center[1], r_x, r_y, rotation, 
+                                pivot[0], pivot[1]))
+            continue
+        if start != end:
+            data.append("M{} {}".format(*start))
+        if path_type == "line":
+            end = values[0]
+            data.append("L{} {}".format(*end))
+        elif path_type == "arc":
+            end = values[5:7]
+            data.append("A{} {} {} {:d} {:d} {} {}".format(
+                values[0], values[1], values[2], int(values[3]), 
+                int(values[4]), *end))
+        elif path_type == "quadratic":
+            end = values[1]
+            data.append("Q{} {} {} {}".format(*(values[0] + values[1])))
+        elif path_type == "cubic":
+            end = values[2]
+            data.append("C{} {} {} {} {} {}".format(*(values[0] + values[1] + 
+                                                      values[2])))
+    if data:
+        elements.insert(0, "<path d=\"{}\" />".format(" ".join(data)))
+    return elements
+
+
+def viewGroup(geometry, center, scale, name):
+    """Return svg group of a view geometry (millimiters, y up) with the
+    center of its bounding box at page point center."""
+    x_min, y_min, x_max, y_max = geometry.boundingBox()
+    transform = "translate({} {}) scale({} {}) translate({} {})".format(
+        center[0], center[1], scale, -scale, 
+        -(x_min + x_max)/2.0, -(y_min + y_max)/2.0)
+    lines = ["<g id=\"{}\" transform=\"{}\">".format(name, transform)]
+    # NOTE: hidden first because visible should overlap hidden
+    for edge_class in (HIDDEN, VISIBLE):
+        elements = svgElements(geometry.select(edge_class))
+        if not elements:
+            continue
+        style = LINE_STYLES[edge_class].format(
+            width=LINE_WIDTHS[edge_class]/scale, 
+            dash=",".join(str(d/scale) for d in HIDDEN_DASH))
+        lines.append("<g style=\"{}\">".format(style))
+        lines.extend(elements)
+        lines.append("</g>")
+    lines.append("</g>")
+    return "\n".join(lines)
+
+
+def viewSize(geometry, scale):
+    x_min, y_min, x_max, y_max = geometry.boundingBox()
+    return ((x_max - x_min)*scale, (y_max - y_min)*scale)
+
+
+def layoutViews(geometries, info, scale):
+    """Return view centers (page millimiters) by view name in third angle
+    layout (as OrthographicTask.replaceViews) with front view at the center 
+    of the drawing area."""
+    top, bottom, left, right = info["margins"] or (0.0, 0.0, 0.0, 0.0)
+    center_x = (left + info["width"] - right)/2.0
+    center_y = (top + info["height"] - bottom)/2.0
+    front = geometries.get("Front")
+    width, height = viewSize(front, scale) if front is not None else (0.0, 0.0)
+    centers = {"Front": (center_x, center_y)}
+    for name, geometry in geometries.items():
+        w, h = viewSize(geometry, scale)
+        if name == "Left":
+            centers[name] = (center_x - (width + w)/2.0 - VIEW_GAP, center_y)
+        elif name == "Right":
+            centers[name] = (center_x + (width + w)/2.0 + VIEW_GAP, center_y)
+        elif name == "Top":
+            centers[name] = (center_x, center_y - (height + h)/2.0 - VIEW_GAP)
+        elif name == "Bottom":
+            centers[name] = (center_x, center_y + (height + h)/2.0 + VIEW_GAP)
+        elif name == "Rear":
+            centers[name] = (center_x + (width + w)*1.5 + 2*VIEW_GAP, center_y)
+    return centers
+
+
+def fillFields(template, fields):
+    """Replace texts of editable fields (freecad:editable) of template."""
+    for name, value in fields.items():
+        pattern = re.compile(r"(freecad:editable=\"{}\"[^>]*>\s*(?:<tspan[^>]*>)?)"
+                             r"[^<]*".format(re.escape(name)))
+        value = str(value).replace("&", "&amp;").replace("<", "&lt;")
+        template = pattern.sub(lambda match: match.group(1) + value, template)
+    return template
+
+
+def drawingSvg(template, geometries, spec):
+    """Return the drawing svg: template with view groups of geometries (a
+    dict of PathGeometry by view name) before its closing tag."""
+    info = readTemplateInfo(template)
+    scale = float(spec["scale"])
+    if isinstance(spec["views"], dict):
+        centers = dict((name, tuple(center)) 
+                       for name, center in spec["views"].items())
+    else:
+        centers = layoutViews(geometries, info, scale)
+    groups = [viewGroup(geometries[name], centers[name], scale, name) 
+              for name in sorted(geometries.keys()) if len(geometries[name])]
+    template = fillFields(template, spec["fields"])
+    end = template.rfind("</svg>")
+    return template[:end] + "\n".join(groups) + "\n" + template[end:]
+
+
+def documentShapes(document, labels=None):
+    """Return shapes of objects with labels (all top level shapes if labels
+    is None) of document."""
+    if labels is None:
+        objects = [obj for obj in document.Objects 
+                   if obj.isDerivedFrom("Part::Feature") and not obj.InList]
+    else:
+        objects = []
+        for label in labels:
+            found = document.getObjectsByLabel(label)
+            if not found:
+                raise ValueError("Part {} not found".format(label))
+            objects.extend(found)
+    return [obj.Shape for obj in objects if not obj.Shape.isNull()]
+
+
+def drawDocument(filename, template, spec, output):
+    """Project views of document filename and write the drawing svg in 
+    output file."""
+    import FreeCAD
+    from Projection import edgeIndexes, projectViews
+    from PathGeometry import PathGeometry
+    document = FreeCAD.openDocument(filename)
+    try:
+        shapes = documentShapes(document, spec["parts"])
+        if not shapes:
+            raise ValueError("No shapes to project")
+        views = list(spec["views"])
+        projections = projectViews(shapes, spec["plane"], views, 
+                                   FreeCAD.Vector(*spec["direction"]), 
+                                   parallel=False, mode=spec["mode"])
+        edges = edgeIndexes(spec["show_hidden"], spec["show_smooth"])
+        geometries = dict((name, PathGeometry.concatenate(
+                               [projected[i] for i in edges if i in projected]))
+                          for name, projected in projections.items())
+    finally:
+        FreeCAD.closeDocument(document.Name)
+    with open(output, "w") as svg_file:
+        svg_file.write(drawingSvg(template, geometries, spec))
+
+
+def _drawJob(args):
+    """Worker process job. Return (filename, error message or None)."""
+    filename, template, spec, output = args
+    try:
+        drawDocument(filename, template, spec, output)
+    except Exception as error:
+        return (filename, "{}: {}".format(type(error).__name__, error))
+    return (filename, None)
+
+
+def _initWorker(paths):
+    for path in paths:
+        if not (path in sys.path):
+            sys.path.append(path)
+
+
+def outputNames(filenames):
+    """Return svg file names (relative to output directory) of documents:
+    <document name>.svg, or its path relative to the common directory of 
+    all documents if a document name is repeated. ValueError is raised if
+    a document is given twice."""
+    paths = [os.path.splitext(os.path.abspath(f))[0] for f in filenames]
+    names = [os.path.basename(path) for path in paths]
+    if len(set(names)) < len(names):
+        parts = [path.split(os.sep) for path in paths]
+        common = len(os.path.commonprefix([p[:-1] for p in parts]))
+        names = [os.path.join(*p[common:]) for p in parts]
+    for name in set(names):
+        if names.count(name) > 1:
+            raise ValueError("Documents with the same output {}.svg".format(name))
+    return [name + ".svg" for name in names]
+
+
+def drawDocuments(filenames, template_file, spec, output_dir, jobs=None, 
+                  paths=()):
+    """Write a drawing svg for each document (see outputNames) in worker 
+    processes. Yield (filename, error message or None) as documents are 
+    finished."""
+    with open(template_file, "r") as svg_file:
+        template = svg_file.read()
+    args = []
+    for filename, name in zip(filenames, outputNames(filenames)):
+        output = os.path.join(output_dir, name)
+        if not os.path.isdir(os.path.dirname(output) or "."):
+            os.makedirs(os.path.dirname(output))
+        args.append((os.path.abspath(filename), template, spec, output))
+    pool = multiprocessing.Pool(jobs or multiprocessing.cpu_count(), 
+                                _initWorker, (list(paths) + 
+                                              [os.path.dirname(os.path.abspath(__file__))],))
+    try:
+        for result in pool.imap_unordered(_drawJob, args):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write drawings of FreeCAD "
+                                     "documents over a svg template.")
+    parser.add_argument("documents", nargs="+", help="FreeCAD documents")
+    parser.add_argument("-t", "--template", required=True, help="svg template")
+    parser.add_argument("-s", "--spec", help="view specification (json)")
+    parser.add_argument("-o", "--output", default=".", 
+                        help="output directory (default current directory)")
+    parser.add_argument("-j", "--jobs", type=int, 
+                        help="worker processes (default cpu count)")
+    parser.add_argument("--freecad-lib", action="append", default=[], 
+                        help="FreeCAD lib directory")
+    args = parser.parse_args(argv)
+    spec = readSpec(args.spec)
+    try:
+        outputNames(args.documents)
+    except ValueError as error:
+        parser.error(str(error))
+    failed = 0
+    for filename, error in drawDocuments(args.documents, args.template, spec, 
+                                         args.output, args.jobs, 
+                                         args.freecad_lib):
+        if error is None:
+            print("{}: done".format(filename))
+        else:
+            failed += 1
+            print("{}: failed ({})".format(filename, error))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
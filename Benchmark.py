@@ -0,0 +1,303 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Benchmarks for the drawing pipeline. They don't need FreeCAD GUI, so run
+them straight from workbench directory:
+    python Benchmark.py [name ...]
+"""
+
+import glob
+import os
+import re
+import sys
+from timeit import default_timer as timer
+
+from SvgParser import iterSegments, parseSvg
+from PathGeometry import ARC, arcsToCenter
+from BRepParser import iterBRep, textStream
+from CurveProjection import brepGeometry
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Test")
+
+
+def syntheticSvg(count):
+    """Create a svg string like Drawing WB output with count segments
+    (lines, arcs and cubic curves alternated)."""
+    paths = []
+    for i in range(count):
+        x, y = 0.5*i, 0.25*i
+        if i % 3 == 0:
+            data = " M {} {} L {} {} ".format(x, y, x+10, y+5)
+        elif i % 3 == 1:
+            data = "M{} {} A10 10 0 0 1 {} {}".format(x, y, x+20, y)
+        else:
+            data = "M{},{} C{},{} {},{} {},{} ".format(x, y, x+1, y+2, 
+                                                        x+3, y+4, x+5, y+6)
+        paths.append("<path d=\"{}\" />".format(data))
+    paths.append("<circle cx =\"0\" cy =\"0\" r =\"20\" />")
+    return "<g>\n{}\n</g>".format("\n".join(paths))
+
+
+def geometrySvg(geometry):
+    """Write a PathGeometry as Drawing.projectToSVG does (a path for each
+    edge, circles and ellipses as elements)."""
+    elements = []
+    for path_type, edge_class, start, values in geometry.iterSegments():
+        if path_type == "circle":
+            elements.append("<circle cx =\"{}\" cy =\"{}\" r =\"{}\" />".format(
+                values[0][0], values[0][1], values[1]))
+            continue
+        if path_type == "ellipse":
+            center, r_x, r_y, rotation, pivot = values
+            elements.append("<g transform=\"rotate({},{},{})\">".format(
+                rotation, pivot[0], pivot[1]) + 
+                "<ellipse cx =\"{}\" cy =\"{}\" rx =\"{}\"  ry =\"{}\"/></g>".format(
+                center[0], center[1], r_x, r_y))
+            continue
+        if path_type == "line":
+            data = "L{},{}".format(*values[0])
+        elif path_type == "arc":
+            data = "A{} {} {} {} {} {},{}".format(*values)
+        elif path_type == "quadratic":
+            data = "Q{},{} {},{}".format(*(values[0] + values[1]))
+        else:
+            data = "C{},{} {},{} {},{}".format(*(values[0] + values[1] + 
+                                                 values[2]))
+        elements.append("<path d=\"M{},{} {}\" />".format(start[0], start[1], 
+                                                          data))
+    return "<g>\n{}\n</g>".format("\n".join(elements))
+
+
+_LEGACY_VALUE = r"\s*\"([\-|\w|\.]*)\""
+
+def legacySegments(svg):
+    """Reference for the regular expressions used by svgParser before the
+    single pass tokenizer: paths, circles and ellipses are scanned 
+    separately and path data is split by re.split. It returns the same 
+    segments as iterSegments (without creating Qt items), not in document
+    order."""
+    re_path = re.finditer(r"\sd=\"([\-|\w|\s|\.|\,]*)\"", svg)
+    re_circle = re.finditer(r"cx ={0}\s+cy ={0}\s+r ={0}".format(_LEGACY_VALUE), svg)
+    re_ellipse = re.finditer(r"(?:<g\s+transform\s*=\s*\"rotate\(([\-|\w|\.]*),\s*"
+                             r"([\-|\w|\.]*),\s*([\-|\w|\.]*)\)\"\s*>\s*)?"
+                             r"<ellipse cx ={0}\s+cy ={0}\s+rx ={0}\s+"
+                             r"ry ={0}".format(_LEGACY_VALUE), svg)
+    segments = []
+    for attr in re_path:
+        list_ = re.split("([M|m|L|l|H|h|V|v|A|a|Q|q|T|t|C|c|S|s])", attr.groups()[0])[1:]
+        for i in range(0, len(list_), 2):
+            type_ = list_[i].strip()
+            coord = list(map(float, re.split(r"[,|\s]+", list_[i+1].strip())))
+            if type_ == "M":
+                current_point = (coord[0], coord[1])
+                segments.append(("move", current_point, ()))
+                continue
+            elif type_ == "L":
+                end = (coord[0], coord[1])
+                segments.append(("line", current_point, (end,)))
+            elif type_ == "A":
+                end = (coord[5], coord[6])
+                segments.append(("arc", current_point, tuple(coord)))
+            elif type_ == "Q" or type_ == "C":
+                points = tuple(zip(coord[::2], coord[1::2]))
+                end = points[-1]
+                path_type = "quadratic" if type_ == "Q" else "cubic"
+                segments.append((path_type, current_point, points))
+            else:
+                raise NotImplementedError("{} command not implemented".format(type_))
+            current_point = end
+    for attr in re_circle:
+        c_x, c_y, r = map(float, attr.groups()) 
+        segments.append(("circle", (c_x, c_y), ((c_x, c_y), r, r)))
+    for attr in re_ellipse:
+        rot, p_x, p_y, c_x, c_y, r_x, r_y = attr.groups()
+        center = (float(c_x), float(c_y))
+        if rot is None:
+            rotation, pivot = 0.0, center
+        else:
+            rotation, pivot = float(rot), (float(p_x), float(p_y))
+        segments.append(("ellipse", center, (center, float(r_x), float(r_y), 
+                                             rotation, pivot)))
+    return segments
+
+
+def timeIt(function, repeat):
+    """Return best time of repeat calls."""
+    best = None
+    for i in range(repeat):
+        start = timer()
+        function()
+        elapsed = timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def benchSvgParser(repeat=5):
+    """Throughput of svg tokenizer in segments per second."""
+    inputs = []
+    for filename in sorted(glob.glob(os.path.join(TEST_DIR, "*.svg"))):
+        with open(filename, "r") as svg_file:
+            inputs.append((os.path.basename(filename), svg_file.read()))
+    for count in (1000, 10000, 50000):
+        inputs.append(("synthetic {}".format(count), syntheticSvg(count)))
+    print("{:<20} {:>8} {:>14} {:>14}".format("svg", "segments", 
+                                              "legacy seg/s", "single seg/s"))
+    for name, svg in inputs:
+        result = list(iterSegments(svg))
+        if sorted(legacySegments(svg)) != sorted(result):
+            raise ValueError("{}: legacy parser segments differ".format(name))
+        segments = sum(1 for s in result if s[0] != "move")
+        # small fixtures must be repeated to be measurable
+        loops = max(1, 20000 // max(segments, 1))
+        legacy = timeIt(lambda: [legacySegments(svg) for i in range(loops)], repeat)
+        single = timeIt(lambda: [list(iterSegments(svg)) for i in range(loops)], repeat)
+        print("{:<20} {:>8} {:>14.0f} {:>14.0f}".format(name, segments, 
+                                                         segments*loops/legacy, 
+                                                         segments*loops/single))
+
+
+def benchArcs(repeat=5):
+    """Arcs converted to center parameterization per second, one by one
+    and in a single vectorized pass."""
+    print("{:<10} {:>14} {:>14}".format("arcs", "single arc/s", "batch arc/s"))
+    for count in (100, 1000, 10000):
+        geometry = parseSvg(syntheticSvg(3*count))
+        arc = geometry.types == ARC
+        start = geometry.points[arc, 0]
+        end = geometry.points[arc, 3]
+        params = geometry.params[arc]
+        single = timeIt(lambda: [arcsToCenter(start[i], end[i], params[i]) 
+                                 for i in range(len(params))], repeat)
+        batch = timeIt(lambda: arcsToCenter(start, end, params), repeat)
+        print("{:<10} {:>14.0f} {:>14.0f}".format(len(params), 
+                                                   len(params)/single, 
+                                                   len(params)/batch))
+
+
+def benchGeometry2D(repeat=5, count=10000):
+    """Calls per second of Utils geometry functions and Geometry2D ones. It
+    needs FreeCAD python (Utils imports FreeCAD and PySide)."""
+    try:
+        import numpy as np
+        from PySide import QtCore
+        import Utils
+        import Geometry2D
+    except ImportError as error:
+        print("skipped: {}".format(error))
+        return
+    angles = [0.1*i for i in range(count)]
+    vector = QtCore.QPointF(12, -2)
+    points = np.random.rand(count, 2)
+    cases = [("rotate", 
+              lambda: [Utils.rotate(vector, a) for a in angles],
+              lambda: [Geometry2D.rotate(12, -2, a) for a in angles]),
+             ("arrow head", 
+              lambda: [(Utils.rotate(QtCore.QPointF(12, -2), a), 
+                        Utils.rotate(QtCore.QPointF(12, 2), a)) 
+                       for a in angles[:100]*100],
+              lambda: [Geometry2D.arrowHead("Filled Arrow", a) 
+                       for a in angles[:100]*100]),
+             ("mmtopx points", 
+              lambda: [Utils.mmtopx(QtCore.QPointF(x, y)) 
+                       for x, y in points.tolist()],
+              lambda: [QtCore.QPointF(x, y) for x, y in 
+                       Geometry2D.mmToPx(points).tolist()]),
+             ("mmtopx array", 
+              lambda: [(Utils.mmtopx(x), Utils.mmtopx(y)) 
+                       for x, y in points.tolist()],
+              lambda: Geometry2D.mmToPx(points)),
+             ("pxtomm array", 
+              lambda: [(x*Geometry2D.PX_TO_MM, y*Geometry2D.PX_TO_MM) 
+                       for x, y in points.tolist()],
+              lambda: Geometry2D.pxToMm(points))]
+    print("{:<14} {:>14} {:>14}".format("function", "Utils call/s", 
+                                        "Geometry2D call/s"))
+    for name, legacy, fast in cases:
+        print("{:<14} {:>14.0f} {:>14.0f}".format(name, 
+                                                   count/timeIt(legacy, repeat), 
+                                                   count/timeIt(fast, repeat)))
+
+
+def benchProjection(repeat=5):
+    """Projected edges converted per second by the svg round trip (svg 
+    written as Drawing.projectToSVG does, then parsed) and by the native 
+    conversion of BRep curves (CurveProjection). Fixtures are whole solids
+    (faces and wires are read too) and Drawing.projectToSVG cost (another 
+    hidden line removal) isn't in the svg column, so with FreeCAD available
+    whole views are projected both ways too."""
+    print("{:<22} {:>8} {:>14} {:>14}".format("brep", "edges", 
+                                              "svg edge/s", "native edge/s"))
+    fixtures = []
+    for filename in sorted(glob.glob(os.path.join(TEST_DIR, "*.brep"))):
+        with open(filename, "r") as brep_file:
+            brep = brep_file.read()
+        fixtures.append((filename, brep))
+        edges = sum(1 for item in iterBRep(textStream(brep)) 
+                    if item[0] == "edge")
+        geometry = brepGeometry(brep)
+        svg = geometrySvg(geometry)
+        loops = max(1, 5000 // max(edges, 1))
+        round_trip = timeIt(lambda: [parseSvg(geometrySvg(geometry)) 
+                                     for i in range(loops)], repeat)
+        parse = timeIt(lambda: [parseSvg(svg) for i in range(loops)], repeat)
+        native = timeIt(lambda: [brepGeometry(brep) for i in range(loops)], 
+                        repeat)
+        print("{:<22} {:>8} {:>14.0f} {:>14.0f}".format(
+            os.path.basename(filename), edges, edges*loops/parse, 
+            edges*loops/native))
+        print("{:<22} {:>8} {:>14.0f} {:>14}".format("  (write + parse)", "", 
+                                                      edges*loops/round_trip, ""))
+    try:
+        import FreeCAD
+        import Part
+        from Projection import projectView
+    except ImportError as error:
+        print("FreeCAD views skipped: {}".format(error))
+        return
+    print("{:<22} {:>8} {:>14} {:>14}".format("view", "", "svg view/s", 
+                                              "native view/s"))
+    direction = FreeCAD.Vector(0, 0, -1)
+    for filename, brep in fixtures:
+        shape = Part.Shape()
+        shape.importBrepFromString(brep)
+        svg = timeIt(lambda: projectView(shape, "XY", "Front", direction, 
+                                         native=False), repeat)
+        native = timeIt(lambda: projectView(shape, "XY", "Front", direction, 
+                                            native=True), repeat)
+        print("{:<22} {:>8} {:>14.1f} {:>14.1f}".format(
+            os.path.basename(filename), "", 1/svg, 1/native))
+
+
+BENCHMARKS = {"svgparser": benchSvgParser,
+              "arcs": benchArcs,
+              "geometry2d": benchGeometry2D,
+              "projection": benchProjection}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or sorted(BENCHMARKS.keys())
+    for name in names:
+        print("== {} ==".format(name))
+        BENCHMARKS[name]()
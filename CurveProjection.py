@@ -0,0 +1,187 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Project curves of a BRep (as read by BRepParser) straight into PathGeometry.
+Edges returned by Drawing.projectEx are converted without writing and 
+parsing a svg string: lines, circles and ellipses keep their exact form and
+splines become cubic Beziers (see BRepParser.toCubicBeziers).
+"""
+
+from math import atan2, ceil, cos, degrees, pi as PI
+import numpy as np
+
+from BRepParser import iterBRep, textStream, Line, Circle, Ellipse, \
+                       Bezier, BSpline, TrimmedCurve, BEZIER_TOLERANCE
+from PathGeometry import PathGeometry, VISIBLE
+
+# Lines used for curves without a Bezier form (parabola, offset curves...)
+POLYLINE_STEPS = 32
+# Radius tolerance to take an ellipse as a circle (or as a line)
+RADIUS_TOLERANCE = 1e-9
+
+
+_axes = {}
+
+
+def projectorAxes(direction):
+    """Return x and y axes of the projection plane used by Drawing WB for
+    a view direction (the x direction of an OpenCASCADE gp_Ax2)."""
+    key = (float(direction[0]), float(direction[1]), float(direction[2]))
+    if not (key in _axes):
+        _axes[key] = _projectorAxes(key)
+    return _axes[key]
+
+
+def _projectorAxes(direction):
+    z = np.array(direction, float)
+    z = z / np.sqrt((z**2).sum())
+    a, b, c = z
+    if abs(b) <= abs(a) and abs(b) <= abs(c):
+        x = (-c, 0.0, a) if abs(a) > abs(c) else (c, 0.0, -a)
+    elif abs(a) <= abs(b) and abs(a) <= abs(c):
+        x = (0.0, -c, b) if abs(b) > abs(c) else (0.0, c, -b)
+    else:
+        x = (-b, a, 0.0) if abs(a) > abs(b) else (b, -a, 0.0)
+    x = np.array(x) / np.sqrt(np.dot(x, x))
+    return (x, np.cross(z, x))
+
+
+def projectPoints(points, axes):
+    """Project (n, 3) points over the plane of axes. Return (n, 2) array."""
+    return np.column_stack([points.dot(axes[0]), points.dot(axes[1])])
+
+
+def conicSegments(curve, u_1, u_2, axes):
+    """Segments of a projected circle or ellipse: circle or ellipse when it
+    is closed, svg arc otherwise."""
+    if isinstance(curve, Circle):
+        r_1 = r_2 = curve.r
+    else:
+        r_1, r_2 = curve.r_1, curve.r_2
+    center = tuple(projectPoints(curve.P[np.newaxis], axes)[0])
+    # C(u) = center + cos(u) a + sin(u) b, a and b are conjugate semi axes
+    a = projectPoints(r_1*curve.Dx[np.newaxis], axes)[0]
+    b = projectPoints(r_2*curve.Dy[np.newaxis], axes)[0]
+    t = 0.5*atan2(2*a.dot(b), a.dot(a) - b.dot(b))
+    major = a*np.cos(t) + b*np.sin(t)
+    minor = -a*np.sin(t) + b*np.cos(t)
+    r_x, r_y = np.sqrt(major.dot(major)), np.sqrt(minor.dot(minor))
+    if min(r_x, r_y) < RADIUS_TOLERANCE: #seen edgewise
+        return edgewiseSegments(center, major, minor, u_1 - t, u_2 - t)
+    circle = abs(r_x - r_y) < RADIUS_TOLERANCE*max(r_x, 1.0)
+    rotation = 0.0 if circle else degrees(atan2(major[1], major[0]))
+    if u_2 - u_1 >= 2*PI - 1e-9:
+        if circle:
+            return [("circle", center, (center, r_x, r_x))]
+        return [("ellipse", center, (center, r_x, r_y, rotation, center))]
+    start, end = [tuple(p) for p in 
+                  projectPoints(curve.evaluate([u_1, u_2]), axes).tolist()]
+    large_arc = 1.0 if u_2 - u_1 > PI else 0.0
+    sweep = 1.0 if major[0]*minor[1] - major[1]*minor[0] > 0 else 0.0
+    return [("move", start, ()),
+            ("arc", start, (r_x, r_y, rotation, large_arc, sweep) + end)]
+
+
+def edgewiseSegments(center, major, minor, v_1, v_2):
+    """Segment of a circle or ellipse seen edgewise: a single line between
+    the extreme points of C(v) = center + cos(v) major + sin(v) minor for v 
+    in [v_1, v_2] (one of the semi axes is null)."""
+    if np.dot(minor, minor) > np.dot(major, major): #sin(v) = cos(v - PI/2)
+        major, v_1, v_2 = minor, v_1 - 0.5*PI, v_2 - 0.5*PI
+    low, high = sorted([cos(v_1), cos(v_2)])
+    k = int(ceil(v_1/PI))
+    while k*PI <= v_2 and (low > -1.0 or high < 1.0):
+        if k % 2:
+            low = -1.0
+        else:
+            high = 1.0
+        k += 1
+    start, end = [tuple((np.asarray(center) + c*major).tolist()) 
+                  for c in (low, high)]
+    return [("move", start, ()), ("line", start, (end,))]
+
+
+def cubicSegments(curve, u_1, u_2, axes, tolerance=BEZIER_TOLERANCE):
+    """Segments of a projected Bezier or B-spline (cubic Beziers)."""
+    cubics = curve.toCubics(u_1, u_2, tolerance)
+    cubics = projectPoints(cubics.reshape(-1, 3), axes).reshape(-1, 4, 2)
+    if len(cubics) == 0:
+        return []
+    segments = [("move", tuple(cubics[0, 0]), ())]
+    for points in cubics.tolist():
+        segments.append(("cubic", tuple(points[0]), 
+                         tuple(tuple(p) for p in points[1:])))
+    return segments
+
+
+def lineSegments(curve, u_1, u_2, axes, steps=POLYLINE_STEPS):
+    """Segments of a projected curve as a polyline with steps lines."""
+    points = projectPoints(curve.evaluate(np.linspace(u_1, u_2, steps + 1)), 
+                           axes).tolist()
+    segments = [("move", tuple(points[0]), ())]
+    for start, end in zip(points[:-1], points[1:]):
+        segments.append(("line", tuple(start), (tuple(end),)))
+    return segments
+
+
+def curveSegments(curve, u_1, u_2, axes, tolerance=BEZIER_TOLERANCE):
+    """Return SvgParser.iterSegments tuples of curve in [u_1, u_2] 
+    projected over the plane of axes (see projectorAxes)."""
+    while isinstance(curve, TrimmedCurve):
+        u_1, u_2 = max(u_1, curve.u_1), min(u_2, curve.u_2)
+        curve = curve.basis
+    if isinstance(curve, Line):
+        start, end = [tuple(p) for p in 
+                      projectPoints(curve.evaluate([u_1, u_2]), axes).tolist()]
+        return [("move", start, ()), ("line", start, (end,))]
+    if isinstance(curve, Circle) or isinstance(curve, Ellipse):
+        return conicSegments(curve, u_1, u_2, axes)
+    if isinstance(curve, Bezier) or isinstance(curve, BSpline):
+        return cubicSegments(curve, u_1, u_2, axes, tolerance)
+    return lineSegments(curve, u_1, u_2, axes)
+
+
+def brepGeometry(brep, direction=(0, 0, 1), edge_class=VISIBLE, 
+                 tolerance=BEZIER_TOLERANCE):
+    """Convert edges of a BRep (string or file object, usually a shape 
+    returned by Drawing.projectEx) into a PathGeometry with the same 
+    coordinates as Drawing.projectToSVG output for direction. Raise
+    NotImplementedError if the BRep has locations (they are not applied)
+    or a curve not supported."""
+    axes = projectorAxes(direction)
+    curves = {}
+    segments = []
+    for kind, index, item in iterBRep(textStream(brep)):
+        if kind == "locations" and index:
+            raise NotImplementedError("BRep locations are not supported")
+        elif kind == "curve":
+            curves[index] = item
+        elif kind == "edge" and item.curve_index:
+            if item.location:
+                raise NotImplementedError("BRep locations are not supported")
+            segments.extend(curveSegments(curves[item.curve_index], 
+                                          item.param_min, item.param_max,
+                                          axes, tolerance))
+    return PathGeometry.fromSegments(segments, edge_class)
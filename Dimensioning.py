@@ -28,6 +28,7 @@ import FreeCADGui, FreeCAD
 import Dimensioning_rc #create resources
 import Page
 import Orthographic
+import AutoUpdate
 import Annotation
 import Image
 import Test
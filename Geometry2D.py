@@ -0,0 +1,91 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Plain 2D geometry helpers for paint loops. Unlike the Utils functions they
+take and return floats and tuples (no Qt objects, no NumPy for scalars), and
+arrays are converted in a single NumPy operation.
+"""
+
+from math import sin, cos, radians, degrees, acos, sqrt
+import numpy as np
+
+DPI = 90.0 #Inkscape default
+MM_TO_PX = DPI / 25.4 # 1 in -> 25.4 mm
+PX_TO_MM = 25.4 / DPI
+
+# Arrow head points relative to the head (pointing to +x before rotation)
+ARROW_HEADS = {"Filled Arrow": ((12.0, -2.0), (0.0, 0.0), (12.0, 2.0)),
+               "Open Arrow": ((12.0, -3.0), (0.0, 0.0), (12.0, 3.0))}
+ARROW_CACHE_SIZE = 4096
+ARROW_ANGLE_DIGITS = 4 # decimal digits of cached angles (degrees)
+_arrow_cache = {}
+
+
+def mmToPx(values):
+    """Convert a number or an array (any shape) of millimiters to pixels."""
+    if isinstance(values, float) or isinstance(values, int):
+        return values * MM_TO_PX
+    return np.asarray(values, float) * MM_TO_PX
+
+
+def pxToMm(values):
+    """Convert a number or an array (any shape) of pixels to millimiters."""
+    if isinstance(values, float) or isinstance(values, int):
+        return values * PX_TO_MM
+    return np.asarray(values, float) * PX_TO_MM
+
+
+def rotate(x, y, angle):
+    """Rotate vector (x, y) as Utils.rotate. Angle in degrees."""
+    angle = radians(angle)
+    c, s = cos(angle), sin(angle)
+    return (x*c + y*s, -x*s + y*c)
+
+
+def angleBetween(u_x, u_y, v_x, v_y):
+    """Signed angle in degrees between vectors u and v (see 
+    PathGeometry._angleBetween for arrays)."""
+    norm = sqrt((u_x*u_x + u_y*u_y) * (v_x*v_x + v_y*v_y))
+    cosine = max(-1.0, min(1.0, (u_x*v_x + u_y*v_y) / norm))
+    factor = 1 if u_x*v_y - u_y*v_x >= 0 else -1
+    return factor*degrees(acos(cosine))
+
+
+def arrowHead(head, angle):
+    """Return points of arrow head (relative to head point) of type head
+    for a line with angle (degrees, as QLineF.angle). Points are cached by
+    head and angle rounded to ARROW_ANGLE_DIGITS, so repaints don't compute
+    them again. Return an empty tuple for heads without polygon."""
+    angle = round(angle, ARROW_ANGLE_DIGITS)
+    key = (head, angle)
+    points = _arrow_cache.get(key)
+    if points is None:
+        if len(_arrow_cache) >= ARROW_CACHE_SIZE:
+            _arrow_cache.clear()
+        points = tuple((-x, -y) for x, y in
+                       (rotate(p[0], p[1], angle)
+                        for p in ARROW_HEADS.get(head, ())))
+        _arrow_cache[key] = points
+    return points
@@ -28,8 +28,24 @@ Superclasses for all graphic items on page.
 """
 
 from PySide import QtGui, QtCore
-from Utils import mmtopx, mmtopt, rotate, angleBetween
+from Utils import mmtopx, mmtopt
+from Geometry2D import MM_TO_PX, PX_TO_MM, arrowHead, mmToPx, pxToMm
+from PathGeometry import PathGeometry, arcsToCenter
 import FreeCAD
+import numpy as np
+
+# Level of detail (device pixels per scene pixel) thresholds
+VERTEX_LOD = 0.5 #vertices are hidden below it
+SIMPLIFY_LOD = 0.5 #curves are drawn as a few chords below it
+MIN_SEGMENT_PX = 1.0 #smaller segments (device pixels) are skipped
+# Points of a PathGeometry segment (points row) drawn by PathItem data
+_PX_POINTS = {"line": (3,), "quadratic": (1, 3), "cubic": (1, 2, 3), 
+              "circle": (0,), "ellipse": (0,)}
+
+def levelOfDetail(painter):
+    """Return level of detail of painter (scale from item to device)."""
+    return QtGui.QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+        painter.worldTransform())
 
 
 class GraphicItem(QtGui.QGraphicsItem):
@@ -98,17 +114,14 @@ class Arrow(QtGui.QGraphicsLineItem):
         # Draw head
         pos = self.mapFromScene(self.getHeadPos())
         angle = self.line().angle()
+        x, y = pos.x(), pos.y()
         if self.head == "Filled Arrow":
-            polygon = QtGui.QPolygonF()
-            polygon.append(pos - rotate(QtCore.QPointF(12, -2), angle))
-            polygon.append(pos + QtCore.QPointF(0, 0))
-            polygon.append(pos - rotate(QtCore.QPointF(12, 2), angle))
+            polygon = QtGui.QPolygonF([QtCore.QPointF(x + p_x, y + p_y) 
+                                       for p_x, p_y in arrowHead(self.head, angle)])
             painter.drawPolygon(polygon)
         elif self.head == "Open Arrow":
-            polyline = QtGui.QPolygonF()
-            polyline.append(pos - rotate(QtCore.QPointF(12, -3), angle))
-            polyline.append(pos + QtCore.QPointF(0, 0))
-            polyline.append(pos - rotate(QtCore.QPointF(12, 3), angle))
+            polyline = QtGui.QPolygonF([QtCore.QPointF(x + p_x, y + p_y) 
+                                        for p_x, p_y in arrowHead(self.head, angle)])
             painter.drawPolyline(polyline)
         elif self.head == "Dot":
             painter.drawEllipse(pos, 2, 2)
@@ -147,13 +160,26 @@ class PointCatcher(QtGui.QGraphicsRectItem):
         painter.setPen(pen)
         painter.drawRect(item_pos.x()-4, item_pos.y()-4, 9, 9)
         
+def arcToCenter(start_point, data):
+    """Convert a svg arc from endpoint to center parameterization.
+    start_point is a (x, y) tuple and data are the svg arc values (r_x, r_y, 
+    rotation, large_arc, sweep, x, y). Return (c_x, c_y, r_x, r_y, 
+    start_angle, arc_angle), angles in degrees.
+    https://www.w3.org/TR/SVG/implnote.html#ArcConversionEndpointToCenter
+    """
+    # NOTE: It seems that FreeCAD never apply rotation to the arcs.
+    #       FreeCAD recalculate new values to the arc instead.
+    # NOTE: Use PathGeometry.arcCenters to convert many arcs at once.
+    return tuple(arcsToCenter(start_point, data[5:7], data[:5])[0].tolist())
+
+
 #TODO LIST
 # () Refazer a shape circulo
 # () Refazer a shape elipse
 # () Refazer a shape arc        
 class PathItem(QtGui.QGraphicsPathItem):
     """Generic class to all paths."""
-    def __init__(self, path_type, start_point, *path_data):
+    def __init__(self, path_type, start_point, *path_data, **kwargs):
         super(PathItem, self).__init__()
 #        self.editModeOn = False
         self.path_type = path_type
@@ -165,77 +191,46 @@ class PathItem(QtGui.QGraphicsPathItem):
         self.pen.setCapStyle(QtCore.Qt.RoundCap)
         self.setPen(self.pen)
         self.setAcceptHoverEvents(True)
+        # NOTE: createItems gives start point and data already converted to
+        #       pixels (all points of a geometry are converted at once)
+        px_start = kwargs.get("px_start")
+        if px_start is None:
+            px_start = mmtopx(self.start_point)
+        px_data = kwargs.get("px_data")
+        if px_data is None:
+            px_data = [mmtopx(p) for p in self.path_data]
         # Create path
-        path = QtGui.QPainterPath(mmtopx(self.start_point))
+        path = QtGui.QPainterPath(px_start)
 #        path.moveTo(mmtopx(self.start_point))
         if self.path_type == "line":
-            path.lineTo(mmtopx(self.path_data[0]))
+            path.lineTo(px_data[0])
         elif self.path_type == "arc":
-            path.arcTo(*self.convertArc(path_data))
+            path.arcTo(*self.convertArc(path_data, kwargs.get("arc")))
         elif self.path_type == "quadratic":
-            path_data = [mmtopx(p) for p in self.path_data]
-            path.quadTo(*path_data)
+            path.quadTo(*px_data)
         elif self.path_type == "cubic":
-            path_data = [mmtopx(p) for p in self.path_data]
-            path.cubicTo(*path_data)
+            path.cubicTo(*px_data)
         elif self.path_type == "circle":
-            data = [mmtopx(p) for p in self.path_data]
-            path.addEllipse(*data)
+            path.addEllipse(*px_data)
         elif self.path_type == "ellipse":
             self.setTransformOriginPoint(self.path_data[-1])
             self.setRotation(self.path_data[-2])
             self.path_data = tuple(self.path_data[:-2])
-            path_data = [mmtopx(p) for p in self.path_data]
-            path.addEllipse(*path_data)
+            path.addEllipse(*px_data[:3])
         self.setPath(path)
     
     #FIXME: It still create wrong arcs sometimes!
-    def convertArc(self, data):
-        """Convert parameterization from endpoint to center.
+    def convertArc(self, data, arc=None):
+        """Convert parameterization from endpoint to center. arc is the
+        center parameterization if it is already computed (see 
+        PathGeometry.arcCenters).
         https://www.w3.org/TR/SVG/implnote.html#ArcConversionEndpointToCenter
         https://mortoray.com/2017/02/16/rendering-an-svg-elliptical-arc-as-bezier-curves/
         """
-        from math import radians, sin, cos, sqrt
-        import numpy as np
-        x_1 = self.start_point.x()
-        y_1 = self.start_point.y()
-        r_x = data[0]
-        r_y = data[1]
-        phi = radians(data[2]) #rotation
-        f_a = data[3] #large arc
-        f_s = data[4] #sweep
-        x_2 = data[5]
-        y_2 = data[6]
-        # NOTE: It seems that FreeCAD never apply rotation to the arcs.
-        #       FreeCAD recalculate new values to the arc instead.
-        xy_prime = np.mat([[cos(phi), sin(phi)], [-sin(phi), cos(phi)]]) * \
-                   np.array([[(x_1-x_2)/2], [(y_1-y_2)/2]])
-        x_prime = xy_prime.item((0, 0))
-        y_prime = xy_prime.item((1, 0))
-        factor = -1 if f_a == f_s else 1 
-        cr = (x_prime/r_x)**2 + (y_prime/r_y)**2 #c ratio
-        if cr > 1.0:
-            r_x *= sqrt(cr)
-            r_y *= sqrt(cr)
-        dq = (r_x*y_prime)**2+(r_y*x_prime)**2
-        pq = ((r_x*r_y)**2-dq)/dq
-        c_prime = factor*sqrt(max([0, pq])) #max ensure pq >= 0
-        c_prime *= np.array([[r_x*y_prime/r_y], [-r_y*x_prime/r_x]])
-        c = np.mat([[cos(phi), -sin(phi)], [sin(phi), cos(phi)]])*c_prime + \
-            np.array([[(x_1+x_2)/2], [(y_1+y_2)/2]])
-        c_x_prime = c_prime.item((0, 0))
-        c_y_prime = c_prime.item((1, 0))
-        start_angle = angleBetween(np.array([[1], [0]]), 
-                                   np.array([[(x_prime-c_x_prime)/r_x],
-                                             [(y_prime-c_y_prime)/r_y]]))
-        arc_angle = angleBetween(np.array([[(x_prime-c_x_prime)/r_x],
-                                           [(y_prime-c_y_prime)/r_y]]),
-                                 np.array([[(-x_prime-c_x_prime)/r_x],
-                                           [(-y_prime-c_y_prime)/r_y]])) % 360   
-        if f_s == 0 and arc_angle > 0:
-            arc_angle -= 360
-        elif f_s == 1 and arc_angle < 0:
-            arc_angle += 360    
+        if arc is None:
+            start_point = (self.start_point.x(), self.start_point.y())
+            arc = arcToCenter(start_point, data)
+        c_x, c_y, r_x, r_y, start_angle, arc_angle = arc
         # TODO: consider phi here to calculate rect
         # Real rect (dimensions in millimiters)
         rect = QtCore.QRectF()
@@ -243,20 +238,27 @@ class PathItem(QtGui.QGraphicsPathItem):
         height = 2 * r_y
         rect.setWidth(width)
         rect.setHeight(height)
-        center = QtCore.QPointF(c.item((0, 0)), c.item((1, 0)))
+        center = QtCore.QPointF(c_x, c_y)
         rect.moveCenter(center)
         self.path_data = (rect, -start_angle, -arc_angle)
         # Rect to be drawn (dimensions in pixels)
         rect = QtCore.QRectF()
         rect.setWidth(mmtopx(width))
         rect.setHeight(mmtopx(height))
-        center = QtCore.QPointF(mmtopx(c.item((0, 0))), mmtopx(c.item((1, 0))))
+        center = QtCore.QPointF(mmtopx(c_x), mmtopx(c_y))
         rect.moveCenter(center)
         return (rect, -start_angle, -arc_angle)
     
     def setHidden(self):
         self.pen.setStyle(QtCore.Qt.DashLine)
         self.setPen(self.pen)
+
+    def paint(self, painter, option, widget=None):
+        # Skip paths smaller than a device pixel
+        rect = self.path().controlPointRect()
+        size = max(rect.width(), rect.height()) * levelOfDetail(painter)
+        if size >= MIN_SEGMENT_PX:
+            super(PathItem, self).paint(painter, option, widget)
     
     def hoverEnterEvent(self, event):    
         pen = QtGui.QPen(QtGui.QColor(255, 150, 0))
@@ -271,11 +273,13 @@ class PathItem(QtGui.QGraphicsPathItem):
 
 
 class VertexItem(QtGui.QGraphicsPathItem):
-    def __init__(self, point, rotation=[]):
+    def __init__(self, point, rotation=[], px_point=None):
         super(VertexItem, self).__init__()
         self.editModeOn = False
         self.point = point # in millimiters
-        self.px_point = QtCore.QPointF(mmtopx(point.x()), mmtopx(point.y()))
+        if px_point is None:
+            px_point = QtCore.QPointF(mmtopx(point.x()), mmtopx(point.y()))
+        self.px_point = px_point
         if len(rotation):
             self.setTransformOriginPoint(rotation[1])
             self.setRotation(rotation[0])            
@@ -288,12 +292,14 @@ class VertexItem(QtGui.QGraphicsPathItem):
         self.setPath(painter_path)
 
     def __eq__(self, other):
-        return isinstance(other, VertexItem)
+        return isinstance(other, VertexItem) and self.point == other.point
         
     def __hash__(self):
         return hash((self.point.x(), self.point.y()))
     
     def paint(self, painter, option, widget=None):
+        if levelOfDetail(painter) < VERTEX_LOD:
+            return
         brush = QtGui.QBrush(QtCore.Qt.darkGray)
         if self.isSelected():
             brush.setColor(QtCore.Qt.magenta)
@@ -301,4 +307,197 @@ class VertexItem(QtGui.QGraphicsPathItem):
             brush.setColor(QtCore.Qt.darkGray)
         painter.setBrush(brush)
         painter.drawPath(self.path())
-#        super(VertexItem, self).paint(painter, option, widget)
\ No newline at end of file
+#        super(VertexItem, self).paint(painter, option, widget)
+
+def appendSegment(path, path_type, start, data, arc=None):
+    """Append a PathGeometry segment (millimiters) to a QPainterPath (pixels).
+    start is a (x, y) tuple and data as in PathGeometry.iterSegments. arc is
+    the center parameterization of arcs if it is already computed."""
+    toPoint = lambda point: QtCore.QPointF(point[0]*MM_TO_PX, point[1]*MM_TO_PX)
+    if path_type == "circle" or path_type == "ellipse":
+        center = toPoint(data[0])
+        r_x, r_y = data[1]*MM_TO_PX, data[2]*MM_TO_PX
+        if path_type == "ellipse" and data[3]:
+            pivot = toPoint(data[4])
+            transform = QtGui.QTransform()
+            transform.translate(pivot.x(), pivot.y())
+            transform.rotate(data[3])
+            transform.translate(-pivot.x(), -pivot.y())
+            ellipse = QtGui.QPainterPath()
+            ellipse.addEllipse(center, r_x, r_y)
+            path.addPath(transform.map(ellipse))
+        else:
+            path.addEllipse(center, r_x, r_y)
+        return
+    path.moveTo(toPoint(start))
+    if path_type == "line":
+        path.lineTo(toPoint(data[0]))
+    elif path_type == "arc":
+        if arc is None:
+            arc = arcToCenter(start, data)
+        c_x, c_y, r_x, r_y, start_angle, arc_angle = arc
+        rect = QtCore.QRectF(0, 0, 2*r_x*MM_TO_PX, 2*r_y*MM_TO_PX)
+        rect.moveCenter(toPoint((c_x, c_y)))
+        path.arcTo(rect, -start_angle, -arc_angle)
+    elif path_type == "quadratic":
+        path.quadTo(*[toPoint(p) for p in data])
+    elif path_type == "cubic":
+        path.cubicTo(*[toPoint(p) for p in data])
+
+
+class GeometryItem(QtGui.QGraphicsPathItem):
+    """Draw all segments of one edge class of a PathGeometry as a single 
+    path. Segments bounds are kept in a side index to pick them."""
+    def __init__(self, geometry, edge_class):
+        super(GeometryItem, self).__init__()
+        self.geometry = geometry
+        # index of segments (in geometry) drawn by this item
+        self.index = np.flatnonzero(geometry.edge_class == edge_class)
+        self.bounds = geometry.segmentBounds()[self.index]
+        self.hover_index = None
+        self.lod_paths = {} # simplified paths by level of detail bucket
+        # Set pen
+        self.pen = QtGui.QPen(QtCore.Qt.black)
+        self.pen.setWidthF(mmtopx(0.35))
+        self.pen.setCapStyle(QtCore.Qt.RoundCap)
+        self.setPen(self.pen)
+        self.setAcceptHoverEvents(True)
+        # Create path (all arcs are converted at once)
+        self.arcs = geometry.arcCenters()
+        path = QtGui.QPainterPath()
+        for i in self.index:
+            appendSegment(path, *self.segment(i), arc=self.arcs[i])
+        self.setPath(path)
+
+    def segment(self, index):
+        """Return (path_type, start, data) of segment index in geometry."""
+        path_type, edge_class, start, data = next(self.geometry.iterSegments(index))
+        return (path_type, start, data)
+
+    def segmentPath(self, index):
+        """Return a QPainterPath with only segment index in geometry."""
+        path = QtGui.QPainterPath()
+        appendSegment(path, *self.segment(index), arc=self.arcs[index])
+        return path
+
+    def segmentAt(self, pos, tolerance=3.0):
+        """Return geometry index of the segment under pos (item coordinates)
+        or None. tolerance is in pixels."""
+        x, y = pos.x()*PX_TO_MM, pos.y()*PX_TO_MM
+        tol = pxToMm(tolerance)
+        candidates = np.flatnonzero((self.bounds[:, 0] - tol <= x) & 
+                                    (self.bounds[:, 1] - tol <= y) &
+                                    (self.bounds[:, 2] + tol >= x) & 
+                                    (self.bounds[:, 3] + tol >= y))
+        stroker = QtGui.QPainterPathStroker()
+        stroker.setWidth(2*tolerance)
+        for i in candidates:
+            index = self.index[i]
+            if stroker.createStroke(self.segmentPath(index)).contains(pos):
+                return int(index)
+        return None
+
+    def setHidden(self):
+        self.pen.setStyle(QtCore.Qt.DashLine)
+        self.setPen(self.pen)
+
+    def hoverMoveEvent(self, event):
+        index = self.segmentAt(event.pos())
+        if index != self.hover_index:
+            self.hover_index = index
+            self.update()
+
+    def hoverLeaveEvent(self, event):
+        self.hover_index = None
+        self.update()
+
+    def simplifiedPath(self, lod):
+        """Return path drawn at level of detail lod (below SIMPLIFY_LOD). 
+        Curves are drawn as chords and segments smaller than MIN_SEGMENT_PX 
+        are skipped. Paths are cached by power of 2 buckets of lod."""
+        from SpatialIndex import flattenGeometry, CURVE_STEPS
+        bucket = int(np.floor(np.log2(max(lod, 1e-6))))
+        path = self.lod_paths.get(bucket)
+        if path is not None:
+            return path
+        # device pixels by millimiter at bucket
+        scale = MM_TO_PX * 2.0**bucket
+        size = (self.bounds[:, 2:] - self.bounds[:, :2]).max(axis=1) * scale
+        index = self.index[size >= MIN_SEGMENT_PX]
+        geometry = self.geometry
+        geometry = PathGeometry(geometry.types[index], 
+                                geometry.edge_class[index],
+                                geometry.points[index], geometry.params[index])
+        steps = int(min(CURVE_STEPS, max(4, CURVE_STEPS * 2.0**bucket)))
+        chords, owner = flattenGeometry(geometry, steps)
+        path = QtGui.QPainterPath()
+        last = None
+        for start, end in (chords * MM_TO_PX).tolist():
+            if start != last:
+                path.moveTo(*start)
+            path.lineTo(*end)
+            last = end
+        self.lod_paths[bucket] = path
+        return path
+
+    def paint(self, painter, option, widget=None):
+        lod = levelOfDetail(painter)
+        if lod < SIMPLIFY_LOD:
+            painter.setPen(self.pen)
+            painter.setBrush(QtCore.Qt.NoBrush)
+            painter.drawPath(self.simplifiedPath(lod))
+        else:
+            super(GeometryItem, self).paint(painter, option, widget)
+        if self.hover_index is not None:
+            pen = QtGui.QPen(QtGui.QColor(255, 150, 0))
+            pen.setWidthF(2)
+            painter.setPen(pen)
+            painter.setBrush(QtCore.Qt.NoBrush)
+            painter.drawPath(self.segmentPath(self.hover_index))
+
+
+def createItems(geometry):
+    """Create scene items from a PathGeometry.
+    Return paths as a dict of lists by edge class ("visible", "hidden") and 
+    a list of vertices."""
+    from PathGeometry import EDGE_CLASSES
+    paths = dict((name, []) for name in EDGE_CLASSES)
+    arcs = geometry.arcCenters().tolist()
+    # points and radii in pixels
+    px_points = mmToPx(geometry.points).tolist()
+    px_radii = mmToPx(geometry.params[:, :2]).tolist()
+    for i, segment in enumerate(geometry.iterSegments()):
+        path_type, edge_class, start, data = segment
+        px_data = None
+        if path_type != "arc": #arc data are just numbers
+            data = [QtCore.QPointF(*p) if isinstance(p, tuple) else p 
+                    for p in data]
+            px_data = [QtCore.QPointF(*px_points[i][j]) 
+                       for j in _PX_POINTS[path_type]]
+            if path_type == "circle" or path_type == "ellipse":
+                px_data.extend(px_radii[i])
+        paths[edge_class].append(PathItem(path_type, QtCore.QPointF(*start), 
+                                          *data, arc=arcs[i], 
+                                          px_start=QtCore.QPointF(*px_points[i][0]),
+                                          px_data=px_data))
+    vertices = []
+    for point, px_point, rotation in zip(geometry.vertices.tolist(), 
+                                         mmToPx(geometry.vertices).tolist(),
+                                         geometry.vertex_rotation.tolist()):
+        point = QtCore.QPointF(*point)
+        px_point = QtCore.QPointF(*px_point)
+        if rotation[0]:
+            pivot = QtCore.QPointF(rotation[1], rotation[2])
+            vertices.append(VertexItem(point, [rotation[0], pivot], px_point))
+        else:
+            vertices.append(VertexItem(point, px_point=px_point))
+    return (paths, vertices)
+
+
+def createBatchedItems(geometry):
+    """Create one GeometryItem by edge class from a PathGeometry.
+    Return the same structure of createItems (vertices are not created)."""
+    from PathGeometry import EDGE_CLASSES
+    paths = dict((name, [GeometryItem(geometry, code)]) 
+                 for code, name in enumerate(EDGE_CLASSES))
+    return (paths, [])
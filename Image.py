@@ -180,6 +180,7 @@ class ImageView:
     """View for a svg image in draw."""
     def __init__(self, vobj, graphics_item):
         self.image = graphics_item
+        self.position = None
         vobj.Proxy = self
         
     def attach(self, vp):
@@ -187,6 +188,9 @@ class ImageView:
         # https://forum.freecadweb.org/viewtopic.php?t=12139
         from pivy import coin
         vp.addDisplayMode(coin.SoGroup(), "Standard") 
+        if not hasattr(self, "image"): #restored from document
+            self.image = None
+            return
         # Set feature properties
         feature = vp.Object
         feature.File = self.image.filepath
@@ -196,9 +200,32 @@ class ImageView:
         feature.Zvalue = self.image.zValue()
     
     def getGraphicsView(self, vp):
+        """Return graphics view of page (page is shown if it is not)."""
         page = vp.Object.getParentGroup() #feature
         page_view = page.ViewObject.Proxy
+        page_view.showPage()
         return page_view.graphics_view
+
+    def createItems(self, vp, scene):
+        """Add image item to page scene from feature properties."""
+        feature = vp.Object
+        self.image = ImageItem(feature.File)
+        self.image.setEditMode(False)
+        if self.position is not None:
+            self.image.setPos(*self.position)
+        self.image.setScale(feature.Scale)
+        self.image.setRotation(feature.Rotation)
+        self.image.setOpacity(feature.Opacity)
+        self.image.setZValue(feature.Zvalue)
+        center = self.image.boundingRect().center()
+        self.image.setTransformOriginPoint(center)
+        self.image.setVisible(vp.getPropertyByName("Visibility"))
+        scene.addItem(self.image)
+
+    def releaseItems(self, vp):
+        """Keep image position and drop its item (page is unloaded)."""
+        self.__getstate__()
+        self.image = None
     
 #    def setEdit(self, mode):
 #        #https://www.freecadweb.org/wiki/Std_Edit
@@ -207,26 +234,28 @@ class ImageView:
 #        return True
     
     def onDelete(self, vp, subname):
-        """Delete the annotation itens."""
-        graphics_view = self.getGraphicsView(vp)
-        scene = graphics_view.scene()
-        scene.removeItem(self.image)
+        """Delete the image item."""
+        if self.image is not None and self.image.scene():
+            self.image.scene().removeItem(self.image)
         return True
         
     def doubleClicked(self, vp):
         """Called when double click in object in treeview."""
-        page_view = self.getGraphicsView(vp)
-        page_view.graphics_view.setActive()
+        self.getGraphicsView(vp).setActive()
         return True
     
     def onChanged(self, vp, prop):
         """Called when ImageView property changes"""
+        if getattr(self, "image", None) is None: #page is not shown
+            return
         if prop == "Visibility":
             visibility = vp.getPropertyByName("Visibility")
             self.image.setVisible(visibility)
                 
     def updateData(self, fp, prop):
         """Called when Image property changes"""
+        if getattr(self, "image", None) is None: #page is not shown
+            return
         if prop == "Scale":
             scale = fp.getPropertyByName("Scale")
             if scale < 0:
@@ -257,6 +286,17 @@ class ImageView:
         """Return the name of the default display mode. 
         It must be defined in getDisplayModes."""
         return "Standard"
+
+    def __getstate__(self):
+        """Save image position."""
+        if getattr(self, "image", None) is not None:
+            self.position = (self.image.pos().x(), self.image.pos().y())
+        return {"Position": self.position}
+
+    def __setstate__(self, state):
+        position = (state or {}).get("Position")
+        self.position = tuple(position) if position else None
+        return None
      
     
 class ImageCommand:
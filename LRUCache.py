@@ -0,0 +1,88 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Least recently used cache limited by memory. It is shared by caches of
+projected geometries and of rendered template tiles.
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """LRU cache limited by memory. Values must have a nbytes attribute
+    (PathGeometry arrays, pixmap tiles...)."""
+    def __init__(self, max_bytes=64*1024*1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return cached value and mark it as recently used."""
+        value = self._entries.pop(key, None)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries[key] = value #move to the end (most recent)
+        return value
+
+    def put(self, key, value):
+        """Store value and evict least recently used entries if memory 
+        limit is exceeded. Value bigger than limit is not stored."""
+        self.discard(key)
+        if value.nbytes > self.max_bytes:
+            return
+        self._entries[key] = value
+        self.nbytes += value.nbytes
+        self._evict()
+
+    def discard(self, key):
+        """Remove key if it is cached."""
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.nbytes -= value.nbytes
+
+    def setMaxBytes(self, max_bytes):
+        """Change memory limit evicting entries if necessary."""
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until memory limit is met."""
+        while self.nbytes > self.max_bytes:
+            old_key, old = self._entries.popitem(last=False)
+            self.nbytes -= old.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
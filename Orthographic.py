@@ -27,14 +27,187 @@
 Generate a orthographic view.
 """
 
+import base64
+import time
 from PySide import QtGui, QtCore, QtSvg
 import FreeCAD, FreeCADGui
 
 from Utils import getGraphicsView
-from SvgParser import svgParser
-import Drawing
+from Geometry2D import MM_TO_PX, PX_TO_MM, pxToMm
+from PathGeometry import PathGeometry
+from GraphicItem import createItems, createBatchedItems
+from ProjectionCache import ProjectionCache
+from SpatialIndex import SpatialIndex
+from Projection import EDGE_NAMES, PARTS, shapeKey, shapeHash, edgeIndexes, \
+                       joinShapes, groupShapes, projectView, projectItems, \
+                       submitViews, PROJECTION_TIMEOUT
+
+projection_cache = ProjectionCache()
+# Feature properties that change projected geometries
+PROJECTION_PROPERTIES = ("Parts", "Plane", "Direction", "Mode", "Views", 
+                         "ShowHidden", "ShowSmooth")
+
+def viewItems(shapes, plane, view_names, direction, edges, mode=PARTS):
+    """Return (items, missing): lists of (view name, cache key, shapes) of 
+    each group of shapes of views and of groups not in projection_cache."""
+    direction = tuple(direction)
+    items = []
+    for name in view_names:
+        for group in groupShapes(shapes, plane, name, mode):
+            group = [shapes[i] for i in group]
+            key = (mode, shapeKey(group), plane, direction, name)
+            items.append((name, key, group))
+    missing = [item for item in items 
+               if any(not ((item[1] + (EDGE_NAMES[i],)) in projection_cache) 
+                      for i in edges)]
+    return (items, missing)
+
+def projectCachedViews(shapes, plane, view_names, direction, edges, 
+                       mode=PARTS, parallel=True, projected=None):
+    """Return a dict of PathGeometry by view name with edges. Groups of 
+    shapes in projection_cache are not projected again, so after a model 
+    change only groups with changed shapes are projected. projected is a 
+    dict of projectView results by cache key of groups already projected
+    (by a ProjectionJob)."""
+    items, missing = viewItems(shapes, plane, view_names, direction, edges, 
+                               mode)
+    # NOTE: the cache may skip or evict geometries, so cached groups are 
+    #       read before new ones are put and projected groups are never 
+    #       read back from cache
+    missing_keys = set(key for name, key, group in missing)
+    group_geometries = {}
+    for name, key, group in items:
+        if not (key in missing_keys):
+            group_geometries[key] = [projection_cache.get(key + (EDGE_NAMES[i],)) 
+                                     for i in edges]
+    projected = dict(projected or {})
+    missing = [item for item in missing if not (item[1] in projected)]
+    projections = projectItems([(name, group) for name, key, group in missing],
+                               mode, plane, direction, parallel)
+    for (name, key, group), result in zip(missing, projections):
+        projected[key] = result
+    for key, result in projected.items():
+        for i, geometry in result.items():
+            projection_cache.put(key + (EDGE_NAMES[i],), geometry)
+        group_geometries[key] = [result.get(i, PathGeometry()) for i in edges]
+    geometries = {}
+    for name, key, group in items:
+        geometries.setdefault(name, []).extend(group_geometries[key])
+    return dict((name, PathGeometry.concatenate(geometries.get(name, [])).mergeVertices()[0]) 
+                for name in view_names)
+
+class ProjectionJob(QtCore.QObject):
+    """Project views without blocking FreeCAD GUI. Results are polled by a 
+    timer and each view (or group of shapes of a view) is reported as soon 
+    as it is projected."""
+    viewProjected = QtCore.Signal(str, object, object) #view name, group key, projected edges
+    progress = QtCore.Signal(int, int) #projected items, total items
+    finished = QtCore.Signal()
+    def __init__(self, items, mode, plane, direction, parallel=True, 
+                 running=None):
+        super(ProjectionJob, self).__init__()
+        self.items = items #list of (view name, group key, shapes)
+        self.mode = mode
+        self.plane = plane
+        self.direction = direction
+        self.parallel = parallel
+        # AsyncResult by (view name, group key) of items already submitted
+        # by a superseded job (see takeRunning)
+        self.running = running or {}
+        self.pending = list(range(len(items)))
+        self.cancelled = False
+        self.results = []
+        self.last_result = time.time() #time of last reported item
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(50)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        """Start projecting views. Items running for a superseded job are
+        not submitted again."""
+        if self.parallel:
+            try:
+                submit = [(name, shapes) for name, key, shapes in self.items
+                          if not ((name, key) in self.running)]
+                submitted = iter(submitViews(submit, self.mode, self.plane, 
+                                             self.direction))
+                self.results = [self.running[(name, key)] 
+                                if (name, key) in self.running 
+                                else next(submitted)
+                                for name, key, shapes in self.items]
+            except Exception as error:
+                FreeCAD.Console.PrintWarning("Parallel projection failed " + 
+                                             "({}). ".format(error) + 
+                                             "Views will be projected serially.\n")
+                self.parallel = False
+        self.running = {}
+        self.last_result = time.time()
+        self.progress.emit(0, len(self.items))
+        self.timer.start()
+
+    def cancel(self):
+        """Stop reporting views. Running workers are not stopped but their 
+        results are ignored (or taken by another job, see takeRunning)."""
+        self.cancelled = True
+        self.timer.stop()
+
+    def takeRunning(self):
+        """Cancel job and return a dict of AsyncResult by (view name, group
+        key) of items not reported yet, so a new job can wait for them 
+        instead of submitting them again."""
+        self.cancel()
+        if not self.parallel:
+            return {}
+        return dict((self.items[i][:2], self.results[i]) for i in self.pending)
+
+    def isRunning(self):
+        return not self.cancelled and len(self.pending) > 0
+
+    def getBase(self):
+        """Return options shared by all items."""
+        return (self.mode, self.plane, tuple(self.direction))
+
+    def getPendingItems(self):
+        """Return (view name, group key, shapes) not projected yet."""
+        return [self.items[i] for i in self.pending]
+
+    def poll(self):
+        """Report views already projected. Serial projection projects one 
+        item by call, so GUI events are processed between them. Items not
+        projected PROJECTION_TIMEOUT after the last one (a worker died) are
+        reported as failed."""
+        if self.parallel:
+            for i in list(self.pending):
+                if not self.results[i].ready():
+                    continue
+                self.pending.remove(i)
+                self.last_result = time.time()
+                name, key, shapes = self.items[i]
+                try:
+                    projected = self.results[i].get()
+                except Exception as error:
+                    FreeCAD.Console.PrintError("Projection of {} view failed ({}).\n".format(name, error))
+                    continue
+                self.viewProjected.emit(name, key, projected)
+                if self.cancelled: #superseded by a slot
+                    return
+            if self.pending and time.time() - self.last_result > PROJECTION_TIMEOUT:
+                names = sorted(set(self.items[i][0] for i in self.pending))
+                FreeCAD.Console.PrintError("Projection of {} view timed out.\n".format(
+                                           ", ".join(names)))
+                self.pending = []
+        elif self.pending:
+            name, key, shapes = self.items[self.pending.pop(0)]
+            projected = projectView(joinShapes(shapes, self.mode), self.plane, 
+                                    name, self.direction)
+            self.viewProjected.emit(name, key, projected)
+            if self.cancelled:
+                return
+        self.progress.emit(len(self.items) - len(self.pending), len(self.items))
+        if len(self.pending) == 0:
+            self.timer.stop()
+            self.finished.emit()
 
-from math import pi as PI
 
 class OrthographicTask:
     """Create and handle orthographic projection task dialog."""
@@ -42,6 +215,24 @@ class OrthographicTask:
         self.form = FreeCADGui.PySideUic.loadUi(":/ui/task_orthographic.ui")
         self.orthographic_views = {"Front": None} #ensure at least front
         self.selected_parts = [] #part labels to be drawn
+        # NOTE: batched views draw each edge class as one single path item,
+        #       set it False to have one item per segment.
+        self.batched = True
+        # NOTE: views are projected in worker processes, set it False to 
+        #       project them one by one in FreeCAD process.
+        self.parallel = True
+        # NOTE: shapes are joined by a compound (no boolean union), and in 
+        #       each view, only shapes that overlap are projected together.
+        #       See Projection.MODES.
+        self.mode = PARTS
+        self.job = None #current ProjectionJob
+        self.center_scene = False
+        self.front_pos = QtCore.QPointF(0, 0)
+        # Progress of views projection
+        self.progress_bar = QtGui.QProgressBar(self.form)
+        self.progress_bar.setFormat("Projecting views %v/%m")
+        self.progress_bar.hide()
+        self.form.layout().addWidget(self.progress_bar, 6, 0)
         # Handle scene objects
         self.graphics_view = graphics_view
         self.scene = self.graphics_view.scene()
@@ -68,14 +259,18 @@ class OrthographicTask:
         return True
         
     def reject(self):
-        for view in self.orthographic_views.values():
-            self.scene.removeItem(view) #TODO: reescreve isso
+        self.cancelJob()
+        for name in self.orthographic_views:
+            self.removeView(name)
         self.disconnectSlots()
         return True #close dialog
         
     def accept(self):
         if len(self.orthographic_views) > 0:
 #            if 
+            if len(self.selected_parts):
+                self.createFeature()
+            self.cancelJob()
             #TODO: levanta erro se o objeto trocou o nome ou foi deletado
 #            import Drawing, Part
 #            Part.show(Part.makeBox(100,100,100).cut(Part.makeCylinder(80,100)).cut(Part.makeBox(90,40,100)).cut(Part.makeBox(20,85,100)))
@@ -90,6 +285,52 @@ class OrthographicTask:
             return True #close dialog
         return False
 
+    def createFeature(self):
+        """Create Orthographic feature in page with projected geometry of
+        views. Geometry is stored with hash of shapes, so views don't need
+        to be projected again when document is reopened. Groups of shapes
+        not drawn yet are projected by the feature in background (groups 
+        being projected by current job are not submitted again)."""
+        names = [name for name, view in self.orthographic_views.items() if view]
+        pending = self.pendingViews(names)
+        running = self.job.takeRunning() if self.job else {}
+        self.cancelJob()
+        document = self.graphics_view.getDocument()
+        feature = document.addObject("App::FeaturePython", "Orthographic")
+        Orthographic(feature)
+        feature.Parts = list(self.selected_parts)
+        feature.Plane = self.plane
+        feature.Direction = self.front_direction
+        feature.Mode = self.mode
+        feature.Views = names
+        feature.ShowHidden = self.show_hidden
+        feature.ShowSmooth = self.show_smooth
+        geometries = dict((name, self.orthographic_views[name].getGeometry().mergeVertices()[0]) 
+                          for name in names)
+        # NOTE: views not fully drawn are saved as outdated (no hash)
+        shape_hash = "" if pending else shapeHash(self.shapes)
+        feature.Proxy.setGeometries(shape_hash, geometries)
+        views = dict((name, self.orthographic_views[name]) for name in names)
+        OrthographicView(feature.ViewObject, views)
+        page = self.graphics_view.getPage()
+        page.addObject(feature)
+        FreeCAD.ActiveDocument.recompute()
+        if pending:
+            # job items are keyed by cache key, task ones by group key
+            running = dict(((name, self.getCacheKey(group_key, name)), result)
+                           for (name, group_key), result in running.items())
+            feature.Proxy.startProjection(feature, running)
+
+    def pendingViews(self, names):
+        """Return (view name, group key, shapes) of groups of shapes of 
+        views names not drawn yet."""
+        edges = tuple(self.getEdges())
+        parts, missing = self.getViewGeometries(names)
+        return [(name, group_key, shapes) 
+                for name, group_key, shapes in missing
+                if not ((self.getCacheKey(group_key, name) + edges) in 
+                        self.orthographic_views[name].parts)]
+
     ## SLOTS ##
     def keyPress(self, event):
         if event.key() == QtCore.Qt.Key_Escape: #close
@@ -142,9 +383,11 @@ class OrthographicTask:
         """Add or remove a view."""
         if "Front" in self.orthographic_views:
             if state == QtCore.Qt.Checked:
+                self.orthographic_views[name] = None
                 self.drawOrthographic(view_name=name)
             else:
-                self.scene.removeItem(self.orthographic_views.pop(name))
+                self.removeView(name)
+                self.orthographic_views.pop(name)
             
     def changeHidden(self, state):
         """Add or remove hidden lines."""
@@ -201,116 +444,184 @@ class OrthographicTask:
                 self.createTreeWidget(part.Group, item) #make recursive iter
 
     def drawOrthographic(self, center_scene=False, view_name=""):
-        """Create and add a orthographic projection items."""
+        """Create and add a orthographic projection items.
+        Views in cache are drawn at once and the others are projected in 
+        background, a new call supersedes views still being projected."""
         document = self.graphics_view.getDocument()
-        # Get shape
+        # Get shapes
         if len(self.selected_parts) == 0:
-            for view in self.orthographic_views.values():
-                self.scene.removeItem(view)
+            self.cancelJob()
+            for name in self.orthographic_views:
+                self.removeView(name)
             return
-        elif len(self.selected_parts) == 1:
-            shape = document.getObjectsByLabel(self.selected_parts[0])[0].Shape
-        elif len(self.selected_parts) > 1:
-            shape = document.getObjectsByLabel(self.selected_parts[0])[0].Shape
-            for part in self.selected_parts[1:]:
-                next_shape = document.getObjectsByLabel(part)[0].Shape
-                shape = shape.fuse(next_shape) #make a union with shapes
-        # Create views
+        self.shapes = [document.getObjectsByLabel(label)[0].Shape 
+                       for label in self.selected_parts]
+        self.groups = {} #shape groups by view name
         if self.orthographic_views["Front"]:
-            pos = self.orthographic_views["Front"].pos()
+            self.front_pos = self.orthographic_views["Front"].pos()
+        self.center_scene = self.center_scene or center_scene
+        # Create views
         if view_name == "": #redraw all current views in this case
-            for view in self.orthographic_views.values():
-                self.scene.removeItem(view)
-            for name in self.orthographic_views.keys():
-                paths, vertices = self.getView(shape, name)
-                view = OrthographicItemGroup(paths, vertices)
-                self.scene.addItem(view)
-                view.drawView(self.scene)
-                view.verticalFlip()
-                self.orthographic_views[name] = view
+            view_names = list(self.orthographic_views.keys())
         else: #draw only view_name
-            paths, vertices = self.getView(shape, view_name)
-            view = OrthographicItemGroup(paths, vertices)
+            view_names = [view_name]
+        parts, missing = self.getViewGeometries(view_names)
+        for name in view_names:
+            self.drawView(name, parts[name])
+        # Project views not cached
+        running = {} #AsyncResult by (view name, group key) still required
+        if self.job and self.job.isRunning():
+            base = (self.mode, self.plane, tuple(self.front_direction))
+            if self.job.getBase() == base: #keep views still required
+                keys = [item[:2] for item in missing]
+                missing.extend(item for item in self.job.getPendingItems() 
+                               if item[0] in self.orthographic_views and 
+                               not (item[:2] in keys))
+                keys = [item[:2] for item in missing]
+                # NOTE: items no more required are left running (a pool 
+                #       task can't be stopped) but they are not reported
+                running = dict((key, result) for key, result in 
+                               self.job.takeRunning().items() if key in keys)
+            self.cancelJob()
+        if missing:
+            self.job = ProjectionJob(missing, self.mode, self.plane, 
+                                     self.front_direction, self.parallel,
+                                     running)
+            self.job.viewProjected.connect(self.viewProjected)
+            self.job.progress.connect(self.showProgress)
+            self.job.start()
+
+    def cancelJob(self):
+        """Cancel views being projected."""
+        if self.job:
+            self.job.cancel()
+            self.job = None
+        self.progress_bar.hide()
+
+    def viewProjected(self, name, group_key, projected):
+        """Cache and draw a group of shapes of a view projected in 
+        background."""
+        key = self.getCacheKey(group_key, name)
+        for i, geometry in projected.items():
+            projection_cache.put(key + (EDGE_NAMES[i],), geometry)
+        if name in self.orthographic_views:
+            # NOTE: projected geometry is drawn as is, it may not be in
+            #       cache (too large or already evicted)
+            edges = self.getEdges()
+            part_key = key + tuple(edges)
+            geometry = PathGeometry.concatenate([projected[i] for i in edges 
+                                                 if i in projected])
+            geometry = geometry.mergeVertices()[0]
+            front = self.orthographic_views["Front"]
+            if front is not None and front.scene() is self.scene:
+                self.front_pos = front.pos() #it may be dragged meanwhile
+            parts, missing = self.getViewGeometries([name])
+            self.drawView(name, [(k, geometry if k == part_key else g) 
+                                 for k, g in parts[name]])
+
+    def showProgress(self, done, total):
+        """Show views projection progress."""
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.progress_bar.setVisible(done < total)
+
+    def drawView(self, name, parts):
+        """Update items of view name. parts is a list of (part key, geometry)
+        of all shape groups in view, geometry is None if it is not projected
+        yet. Items of parts still in view are kept, items of parts no more 
+        in view are removed and only new parts get new items."""
+        view = self.orthographic_views.get(name)
+        if view is None or view.scene() is not self.scene:
+            view = OrthographicItemGroup({"visible": [], "hidden": []}, [])
             self.scene.addItem(view)
-            view.drawView(self.scene)
             view.verticalFlip()
-            self.orthographic_views[view_name] = view
+            self.orthographic_views[name] = view
+        keys = [key for key, geometry in parts]
+        for key in list(view.parts.keys()):
+            if not (key in keys):
+                view.removePart(key)
+        for key, geometry in parts:
+            if geometry is not None and not (key in view.parts):
+                paths, vertices = self.getView(geometry)
+                view.addPart(key, paths, geometry)
         # Replace all views
-        if center_scene:
-            center = self.scene.sceneRect().center()
-            self.orthographic_views["Front"].centralize(center)
-        else: 
-#            pos = self.orthographic_views["Front"].pos()
-            self.orthographic_views["Front"].setPos(pos)
+        front = self.orthographic_views["Front"]
+        if front is None:
+            return
+        if name == "Front":
+            if self.center_scene:
+                # NOTE: an empty view has no bounding rect, so it is 
+                #       centralized when its first part is projected
+                if front.geometries:
+                    center = self.scene.sceneRect().center()
+                    front.centralize(center)
+                    self.center_scene = False
+            else:
+                front.setPos(self.front_pos)
         self.replaceViews()
-      
-    def getView(self, shape, direction="Front"):
-        """Return lines checked in task dialog.
-        direction is view direction (Front, Right, Top...)
-        Projection are made always over xy plane (z direction), shapes are 
-        rotated 90° and then projected. 
-        - VISIBLE
-        V   hard edge 
-        V1  smooth edges 
-        VN  contour edges 
-        VO  contours apparents 
-        VI  isoparametric 
-        
-        - HIDDEN
-        H   hard edge 
-        H1  smooth edges 
-        HN  contour edges 
-        HO  contours apparents 
-        HI  isoparametric
-        """
-        paths = {"visible": [], "hidden": []}
-        vertices = []
-        edge_visible = [True, self.show_smooth, False, True, False] 
-        edge_hidden = [self.show_hidden, 
-                       True if self.show_hidden and self.show_smooth else False, 
-                       False, 
-                       True if self.show_hidden else False, 
-                       False] 
-        # Change projection plane
-        if self.plane == "XZ":
-            matrix = FreeCAD.Base.Matrix()
-            matrix.rotateX(PI/2)
-            matrix.rotateZ(PI/2)
-            shape = shape.transformGeometry(matrix)
-        elif self.plane == "YZ":
-            matrix = FreeCAD.Base.Matrix()
-            matrix.rotateY(-PI/2)
-            matrix.rotateZ(-PI/2)
-            shape = shape.transformGeometry(matrix)
-        # TODO: VERIFICAR A DIREACO CERTA PARA O REAR 
-        #      dependendo vai ser valor de -180° ou 180°
-        # TODO: Acrescentar first angle
-        # Generate required view
-        rotate = {"Front": lambda m: None, 
-                  "Rear": lambda m: m.rotateY(PI),
-                  "Left": lambda m: m.rotateY(PI/2), 
-                  "Right": lambda m: m.rotateY(-PI/2),
-                  "Top": lambda m: m.rotateX(PI/2),
-                  "Bottom": lambda m: m.rotateX(-PI/2)}
-        matrix = FreeCAD.Base.Matrix()
-        rotate[direction](matrix)
-        shape = shape.transformGeometry(matrix) #rotated shape
-        shape_list = Drawing.projectEx(shape, self.front_direction)
-        shape_visible = shape_list[:5]
-        shape_hidden = shape_list[5:]
-        for edge, shape in zip(edge_visible, shape_visible):
-            if edge:
-                svg = Drawing.projectToSVG(shape, self.front_direction)
-                path, vertex = svgParser(svg) #lists
-                paths["visible"].extend(path)
-                vertices.extend(vertex)
-        for edge, shape in zip(edge_hidden, shape_hidden):
-            if edge:
-                svg = Drawing.projectToSVG(shape, self.front_direction)
-                path, vertex = svgParser(svg) #lists
-                paths["hidden"].extend(path)
-                vertices.extend(vertex)
-        return (paths, vertices)
+
+    def removeView(self, name):
+        """Remove items of view name from scene."""
+        view = self.orthographic_views.get(name)
+        if view is not None and view.scene() is self.scene:
+            self.scene.removeItem(view)
+
+    def getView(self, geometry):
+        """Return paths (dict of lists by edge class) and vertices items of 
+        a view geometry."""
+        if self.batched:
+            return createBatchedItems(geometry)
+        return createItems(geometry)
+
+    def getEdges(self):
+        """Return indexes of projected edges checked in task dialog."""
+        return edgeIndexes(self.show_hidden, self.show_smooth)
+
+    def getGroups(self, view_name):
+        """Return a list of (group key, shapes) of shapes that must be 
+        projected together in view."""
+        if not (view_name in self.groups):
+            groups = groupShapes(self.shapes, self.plane, view_name, self.mode)
+            groups = [[self.shapes[i] for i in group] for group in groups]
+            self.groups[view_name] = [(shapeKey(group), group) 
+                                      for group in groups]
+        return self.groups[view_name]
+
+    def getCacheKey(self, group_key, view_name):
+        """Return projection cache key of a shape group in view with current
+        options (edge name must be appended)."""
+        return (self.mode, group_key, self.plane, 
+                tuple(self.front_direction), view_name)
+
+    def getViewGeometries(self, view_names):
+        """Return a dict of parts by view name (Front, Right, Top...) and a 
+        list of (view name, group key, shapes) not cached. Parts are lists 
+        of (part key, geometry) of each group of shapes (geometry is None
+        if it is not cached).
+        Each group of shapes is cached, so changing line options or adding 
+        a part that doesn't overlap others doesn't project shapes again."""
+        edges = self.getEdges()
+        parts = {}
+        missing = []
+        for name in view_names:
+            parts[name] = []
+            merged = 0
+            for group_key, shapes in self.getGroups(name):
+                key = self.getCacheKey(group_key, name)
+                group = [projection_cache.get(key + (EDGE_NAMES[i],)) 
+                         for i in edges]
+                if any(geometry is None for geometry in group):
+                    missing.append((name, group_key, shapes))
+                    geometry = None
+                else:
+                    # visible and hidden edges share end points
+                    geometry, count = PathGeometry.concatenate(group).mergeVertices()
+                    merged += count
+                parts[name].append((key + tuple(edges), geometry))
+            if merged:
+                FreeCAD.Console.PrintLog("{} view: {} vertices merged\n".format(
+                                         name, merged))
+        return (parts, missing)
 
     def replaceViews(self):
         """Replace views based on front view position."""
@@ -322,21 +633,21 @@ class OrthographicTask:
         if proj_angle == "First Angle":
             pass#TODO: implementar
         elif proj_angle == "Third Angle":
-            if "Rear" in self.orthographic_views:
+            if self.orthographic_views.get("Rear"):
                 pass #TODO: implementar
-            if "Left" in self.orthographic_views:
+            if self.orthographic_views.get("Left"):
                 l_rect = self.orthographic_views["Left"].boundingRect()
                 x = top_left.x() - l_rect.width() - 20 
                 self.orthographic_views["Left"].setPos(x, top_left.y())
-            if "Right" in self.orthographic_views: 
+            if self.orthographic_views.get("Right"): 
                 r_rect = self.orthographic_views["Right"].boundingRect()
                 x = top_left.x() + rect.width() + r_rect.width() + 20 
                 self.orthographic_views["Right"].setPos(x, top_left.y())
-            if "Top" in self.orthographic_views: 
+            if self.orthographic_views.get("Top"): 
                 t_rect = self.orthographic_views["Top"].boundingRect()
                 y = top_left.y() - rect.height() - t_rect.height() - 20 
                 self.orthographic_views["Top"].setPos(top_left.x(), y)
-            if "Bottom" in self.orthographic_views:
+            if self.orthographic_views.get("Bottom"):
                 y = top_left.y() + rect.height() + 20 
                 self.orthographic_views["Bottom"].setPos(top_left.x(), y)
                 
@@ -357,6 +668,10 @@ class OrthographicItemGroup(QtGui.QGraphicsItemGroup):
         self.hidden_lines = paths["hidden"]
         self.addItems(self.visible_lines)
         self.addItems(self.hidden_lines)
+        self.parts = {} #items by part key
+        self.geometries = {} #geometry by part key
+        self.index = None #SpatialIndex of all parts (built when needed)
+        self.merged_vertices = 0 #vertices shared by parts in index
 #        self.configVisible(config)
 #        self.configHidden(config)
         self.setFlag(QtGui.QGraphicsItem.ItemIsMovable)
@@ -367,11 +682,10 @@ class OrthographicItemGroup(QtGui.QGraphicsItemGroup):
         """Edit mode, true when editing (or creating) the image."""
         self.editModeOn = value
     
-#    def boundingRect(self):
-#        margin=10
-#        rect = super(OrthographicItemGroup, self).boundingRect()
-#        rect.adjust(-self.margin, -self.margin, self.margin, self.margin)
-#        return rect
+    # NOTE: parts are added as children (not by addToGroup) after group is
+    #       flipped, so group bounding rect is the children one.
+    def boundingRect(self):
+        return self.childrenBoundingRect()
     
     def addItems(self, items):
         """Add a list of items to group."""
@@ -383,6 +697,71 @@ class OrthographicItemGroup(QtGui.QGraphicsItemGroup):
         for item in items:
             self.removeFromGroup(item)
             
+    def addPart(self, key, paths, geometry=None):
+        """Add items of a part (a group of shapes) as children of group.
+        paths is a dict of lists of items by edge class and geometry the 
+        part PathGeometry (used for snapping)."""
+        self.prepareGeometryChange()
+        if geometry is not None:
+            self.geometries[key] = geometry
+            self.index = None
+        # NOTE: visible lines are stacked over hidden ones
+        for path in paths["hidden"]:
+            path.setHidden()
+            path.setZValue(0)
+            path.setParentItem(self)
+        for path in paths["visible"]:
+            path.setZValue(1)
+            path.setParentItem(self)
+        self.hidden_lines.extend(paths["hidden"])
+        self.visible_lines.extend(paths["visible"])
+        self.parts[key] = paths["hidden"] + paths["visible"]
+
+    def removePart(self, key):
+        """Remove items of a part."""
+        self.prepareGeometryChange()
+        if self.geometries.pop(key, None) is not None:
+            self.index = None
+        for path in self.parts.pop(key):
+            if path in self.visible_lines:
+                self.visible_lines.remove(path)
+            else:
+                self.hidden_lines.remove(path)
+            if path.scene():
+                path.scene().removeItem(path)
+            else:
+                path.setParentItem(None)
+
+    def getGeometry(self):
+        """Return PathGeometry of all parts."""
+        return PathGeometry.concatenate(self.geometries.values())
+
+    def spatialIndex(self):
+        """Return SpatialIndex of the geometry of all parts."""
+        if self.index is None:
+            geometry, self.merged_vertices = self.getGeometry().mergeVertices()
+            self.index = SpatialIndex(geometry)
+        return self.index
+
+    def snap(self, scene_pos, tolerance=5.0):
+        """Return scene position of the nearest vertex to scene_pos or the 
+        nearest point of an edge (the same scene_pos) and the index of the
+        edge in spatialIndex().geometry as (QPointF, vertex index, edge 
+        index). Indices are None if not found. tolerance is in pixels."""
+        pos = self.mapFromScene(scene_pos)
+        x, y = pos.x()*PX_TO_MM, pos.y()*PX_TO_MM
+        tolerance = pxToMm(tolerance)
+        index = self.spatialIndex()
+        vertex = index.nearestVertex(x, y, tolerance)
+        if vertex is not None:
+            v_x, v_y = index.vertices[vertex[0]].tolist()
+            point = self.mapToScene(QtCore.QPointF(v_x*MM_TO_PX, v_y*MM_TO_PX))
+            return (point, vertex[0], None)
+        edge = index.nearestEdge(x, y, tolerance)
+        if edge is not None:
+            return (scene_pos, None, edge[0])
+        return (scene_pos, None, None)
+
     def verticalFlip(self):
         """Flip the group verticaly."""
         pos = self.pos()
@@ -427,22 +806,133 @@ class OrthographicItemGroup(QtGui.QGraphicsItemGroup):
         
 
 class Orthographic:
-    """Feature for a Orthographic Projection in draw."""
+    """Feature for a Orthographic Projection in draw. Projected geometry of
+    each view is saved in document with the hash of the projected shapes,
+    views are projected again only if shapes or projection properties have
+    changed."""
     def __init__(self, obj):
-        
+        obj.addProperty("App::PropertyStringList", "Parts", "Projection",
+                        "Labels of projected parts")
+        obj.addProperty("App::PropertyString", "Plane", "Projection",
+                        "Projection plane (XY, XZ or YZ)")
+        obj.addProperty("App::PropertyVector", "Direction", "Projection",
+                        "Front view direction")
+        obj.addProperty("App::PropertyString", "Mode", "Projection",
+                        "How parts are joined to be projected")
+        obj.addProperty("App::PropertyStringList", "Views", "Projection",
+                        "Projected views (Front, Top...)")
+        obj.addProperty("App::PropertyBool", "ShowHidden", "Projection",
+                        "Show hidden lines")
+        obj.addProperty("App::PropertyBool", "ShowSmooth", "Projection",
+                        "Show smooth lines")
         obj.Proxy = self
+        self.shape_hash = ""
+        self.geometries = {} #PathGeometry by view name
+        self.job = None #ProjectionJob projecting views in background
 
     def onChanged(self, fp, prop):
-        pass # Let ImageView handle this
+        """Mark geometries as outdated when a projection property changes
+        (view provider projects them again)."""
+        if prop in PROJECTION_PROPERTIES and not ("Restore" in fp.State):
+            self.shape_hash = ""
     
     def execute(self, obj):
         pass
 
+    def setGeometries(self, shape_hash, geometries):
+        """Set projected geometries (dict by view name) of shapes with 
+        hash shape_hash."""
+        self.shape_hash = shape_hash
+        self.geometries = geometries
+
+    def getShapes(self, obj):
+        """Return shapes of projected parts still in document."""
+        shapes = []
+        for label in obj.Parts:
+            parts = obj.Document.getObjectsByLabel(label)
+            if len(parts):
+                shapes.append(parts[0].Shape)
+        return shapes
+
+    def isOutdated(self, obj):
+        """True if shapes or views changed since geometries were projected."""
+        if set(self.geometries.keys()) != set(obj.Views):
+            return True
+        return shapeHash(self.getShapes(obj)) != self.shape_hash
+
+    def projectionItems(self, obj):
+        """Return (items, missing) of viewItems for current shapes."""
+        edges = edgeIndexes(obj.ShowHidden, obj.ShowSmooth)
+        return viewItems(self.getShapes(obj), obj.Plane, obj.Views, 
+                         obj.Direction, edges, obj.Mode or PARTS)
+
+    def project(self, obj, projected=None):
+        """Project all views again. projected is a dict of projectView 
+        results by cache key of groups already projected by a 
+        ProjectionJob (see projectCachedViews)."""
+        shapes = self.getShapes(obj)
+        if len(shapes) == 0:
+            self.setGeometries("", {})
+            return
+        edges = edgeIndexes(obj.ShowHidden, obj.ShowSmooth)
+        geometries = projectCachedViews(shapes, obj.Plane, obj.Views, 
+                                        obj.Direction, edges, obj.Mode or PARTS,
+                                        projected=projected)
+        self.setGeometries(shapeHash(shapes), geometries)
+
+    def startProjection(self, obj, running=None):
+        """Project views again in background. Only groups of shapes not in
+        projection_cache are projected (running is a dict of AsyncResult by
+        (view name, cache key) already submitted, see 
+        ProjectionJob.takeRunning). Geometries and view items are updated
+        when job finishes. A job still running is superseded."""
+        self.cancelProjection()
+        items, missing = self.projectionItems(obj)
+        projected = {} #projectView results by cache key
+        job = ProjectionJob(missing, obj.Mode or PARTS, obj.Plane, 
+                            obj.Direction, running=running)
+        job.viewProjected.connect(
+            lambda name, key, result: projected.__setitem__(key, result))
+        job.finished.connect(lambda: self.projectionFinished(obj, job, 
+                                                             projected))
+        self.job = job
+        job.start()
+
+    def cancelProjection(self):
+        """Cancel views being projected in background."""
+        if getattr(self, "job", None):
+            self.job.cancel()
+        self.job = None
+
+    def projectionFinished(self, obj, job, projected):
+        """Set projected geometries and update feature items."""
+        if self.job is not job:
+            return
+        self.job = None
+        self.project(obj, projected)
+        obj.ViewObject.Proxy.updateItems(obj.ViewObject)
+
+    def __getstate__(self):
+        """Save geometries as base64 of PathGeometry.toBytes."""
+        geometries = dict((name, base64.b64encode(geometry.toBytes()).decode("ascii"))
+                          for name, geometry in self.geometries.items())
+        return {"ShapeHash": self.shape_hash, "Geometries": geometries}
+
+    def __setstate__(self, state):
+        if not state:
+            state = {}
+        self.shape_hash = state.get("ShapeHash", "")
+        self.job = None
+        self.geometries = dict((name, PathGeometry.fromBytes(base64.b64decode(data)))
+                               for name, data in state.get("Geometries", {}).items())
+        return None
+
 
 class OrthographicView:
     """View for a orthographic projection in draw."""
-    def __init__(self, vobj, graphics_item):
-        self.orthographic = graphics_item
+    def __init__(self, vobj, graphics_items):
+        self.orthographic = graphics_items #OrthographicItemGroup by view name
+        self.positions = {}
         vobj.Proxy = self
         
     def attach(self, vp):
@@ -450,7 +940,8 @@ class OrthographicView:
         # https://forum.freecadweb.org/viewtopic.php?t=12139
         from pivy import coin
         vp.addDisplayMode(coin.SoGroup(), "Standard") 
-        # Set feature properties
+        if not hasattr(self, "orthographic"): #restored from document
+            self.orthographic = {}
 #        feature = vp.Object
 #        feature.File = self.image.filepath
 #        feature.Scale = self.image.scale()
@@ -462,6 +953,55 @@ class OrthographicView:
         page = vp.Object.getParentGroup() #feature
         page_view = page.ViewObject.Proxy
         return page_view.graphics_view
+
+    def createItems(self, vp, scene):
+        """Add view items to page scene from saved geometries. Views are
+        projected again in background if they are outdated."""
+        feature = vp.Object
+        self.orthographic = {}
+        self.setViewItems(vp, scene)
+        if feature.Proxy.isOutdated(feature):
+            feature.Proxy.startProjection(feature)
+
+    def releaseItems(self, vp):
+        """Keep views position and drop their items (page is unloaded)."""
+        self.__getstate__()
+        self.orthographic = {}
+
+    def getScene(self, vp):
+        """Return scene of page or None if page is not loaded."""
+        page = vp.Object.getParentGroup()
+        if page is None or page.ViewObject is None:
+            return None
+        return getattr(page.ViewObject.Proxy, "scene", None)
+
+    def updateItems(self, vp):
+        """Replace items of views by the feature geometries (after they 
+        are projected again). Views keep their positions."""
+        scene = self.getScene(vp)
+        if scene is not None: #page is not loaded otherwise
+            self.setViewItems(vp, scene)
+
+    def setViewItems(self, vp, scene):
+        """Create or update views items from the feature geometries."""
+        geometries = vp.Object.Proxy.geometries
+        for name in list(self.orthographic.keys()):
+            if not (name in geometries):
+                scene.removeItem(self.orthographic.pop(name))
+        for name, geometry in geometries.items():
+            view = self.orthographic.get(name)
+            if view is None:
+                view = OrthographicItemGroup({"visible": [], "hidden": []}, [])
+                scene.addItem(view)
+                view.verticalFlip()
+                if name in self.positions:
+                    view.setPos(*self.positions[name])
+                view.setVisible(vp.getPropertyByName("Visibility"))
+                self.orthographic[name] = view
+            for key in list(view.parts.keys()):
+                view.removePart(key)
+            paths, vertices = createBatchedItems(geometry)
+            view.addPart(("saved", name), paths, geometry)
     
 #    def setEdit(self, mode):
 #        #https://www.freecadweb.org/wiki/Std_Edit
@@ -471,14 +1011,16 @@ class OrthographicView:
     
     def onDelete(self, vp, subname):
         """Delete the annotation itens."""
-        graphics_view = self.getGraphicsView(vp)
-        scene = graphics_view.scene()
-        scene.removeItem(self.orthographic)
+        vp.Object.Proxy.cancelProjection()
+        for view in self.orthographic.values():
+            if view.scene():
+                view.scene().removeItem(view)
         return True
         
     def doubleClicked(self, vp):
         """Called when double click in object in treeview."""
-        page_view = self.getGraphicsView(vp)
+        page_view = vp.Object.getParentGroup().ViewObject.Proxy
+        page_view.showPage()
         page_view.graphics_view.setActive()
         return True
     
@@ -486,11 +1028,17 @@ class OrthographicView:
         """Called when OrthographicView property changes"""
         if prop == "Visibility":
             visibility = vp.getPropertyByName("Visibility")
-            self.image.setVisible(visibility)
+            for view in self.orthographic.values():
+                view.setVisible(visibility)
                 
     def updateData(self, fp, prop):
-        """Called when Orthographic property changes"""
-        pass
+        """Called when Orthographic property changes. Outdated views of a
+        loaded page are projected again."""
+        if not (prop in PROJECTION_PROPERTIES) or "Restore" in fp.State:
+            return
+        if self.getScene(fp.ViewObject) is not None and \
+           fp.Proxy.isOutdated(fp):
+            fp.Proxy.startProjection(fp)
 
     def getIcon(self):
         return ":/icons/orthoviews.svg"
@@ -503,6 +1051,18 @@ class OrthographicView:
         """Return the name of the default display mode. 
         It must be defined in getDisplayModes."""
         return "Standard"
+
+    def __getstate__(self):
+        """Save views position."""
+        for name, view in self.orthographic.items():
+            self.positions[name] = (view.pos().x(), view.pos().y())
+        return {"Positions": self.positions}
+
+    def __setstate__(self, state):
+        self.orthographic = {}
+        self.positions = dict((name, tuple(pos)) for name, pos in 
+                              (state or {}).get("Positions", {}).items())
+        return None
      
     
 class OrthographicCommand:
@@ -27,6 +27,7 @@
 This module creates a new page for drawing.
 """
 
+from collections import OrderedDict
 from PySide import QtGui
 import FreeCAD, FreeCADGui
 from Utils import getParam
@@ -36,6 +37,46 @@ from PageGraphicsView import PageGraphicsView
 # () implement paper properties 
 # () implement paper preview widget
 
+ITEM_BYTES = 1024 # rough memory of a graphics item
+# Loaded pages (with graphics view and scene), least recently shown first
+loaded_pages = OrderedDict()
+
+def sceneBytes(scene):
+    """Rough memory estimate of a page scene: its graphics items and the
+    geometries kept by view groups."""
+    size = 0
+    for item in scene.items():
+        size += ITEM_BYTES
+        for geometry in getattr(item, "geometries", {}).values():
+            size += geometry.nbytes
+    return size
+
+def unloadPages(max_bytes=None):
+    """Unload least recently shown pages (except the active and the last
+    shown ones) while scenes of loaded pages use more than max_bytes 
+    (LoadedPagesMB preference by default)."""
+    if max_bytes is None:
+        max_bytes = getParam("LoadedPagesMB", "General")*1024*1024
+    mdi = FreeCADGui.getMainWindow().centralWidget()
+    active = mdi.activeSubWindow()
+    sizes = dict((key, sceneBytes(page.scene)) 
+                 for key, page in loaded_pages.items())
+    total = sum(sizes.values())
+    for key, page in list(loaded_pages.items())[:-1]:
+        if total <= max_bytes:
+            break
+        if page.graphics_view.parentWidget() is not active:
+            page.unloadPage()
+            total -= sizes[key]
+
+def closePages(document):
+    """Drop loaded pages of document (called when it is closed)."""
+    for key, page in list(loaded_pages.items()):
+        if page.vp.Object.Document.Name == document.Name:
+            page.hidePage()
+            page.scene = None
+            loaded_pages.pop(key, None)
+
 class Page:
     """
     Container for technical pages objects (DocumentObjectGroupPython).
@@ -149,13 +190,16 @@ class PageView:
 
         
     def doubleClicked(self, vp):
+        self.showPage()
         self.graphics_view.setActive()
         return True
     
     def attach(self, vp):
-        """Create and configure a new QSubWindow in FreeCAD MDIArea"""
+        """Keep page view provider. The QSubWindow in FreeCAD MDIArea is 
+        created only when the page is shown (see showPage)."""
+        self.vp = vp
         self.graphics_view = None
-        self.showPage("") #TODO: this is for now like this just for developing convinience
+        self.scene = None
 #        import os
 #        path = os.path.dirname(__file__)
 #        # NOTE: for any reason os.path.abspath doesn't point to Dimensioning dir
@@ -178,7 +222,7 @@ class PageView:
                 
     def updateData(self, fp, prop):
         """Called when Page property changes"""
-        if prop == "Label" and self.graphics_view:
+        if prop == "Label" and getattr(self, "graphics_view", None):
             self.graphics_view.setWindowTitle(fp.getPropertyByName("Label"))
 #            self.relabel(fp.getPropertyByName("Label"))
         pass
@@ -186,8 +230,9 @@ class PageView:
     def onDelete(self, vp, subname):
         """Delete page"""
         #TODO: salvar o arquivo temp?
-        if vp.getPropertyByName("Visibility"):
-            self.hidePage() 
+        self.hidePage()
+        self.scene = None
+        loaded_pages.pop(id(self), None)
         return True
    
     def relabel(self, title):
@@ -198,12 +243,48 @@ class PageView:
 #        cap = "New Page"#"{} : {}".format(pDoc.getDocument().Label, "page")  
 #        self.relabel(cap)
         
-    def showPage(self, template):
-        self.graphics_view = PageGraphicsView()#template)
+    def showPage(self, template=""):
+        """Create page graphics view (and its scene when page is shown for 
+        the first time) and reload template if its file has changed. Least
+        recently shown pages are unloaded."""
+        if self.graphics_view is None:
+            populate = self.scene is None
+            self.graphics_view = PageGraphicsView(scene=self.scene)#template)
+            self.scene = self.graphics_view.scene()
+            if populate:
+                self.populatePage()
+            self.graphics_view.setWindowTitle(self.vp.Object.Label)
+        self.scene.reloadTemplate()
+        loaded_pages.pop(id(self), None)
+        loaded_pages[id(self)] = self
+        unloadPages()
             
     def hidePage(self):
+        if self.graphics_view is None:
+            return
         subwindow = self.graphics_view.parentWidget()
         subwindow.deleteLater() #schedule for deletion
+        self.graphics_view = None
+        loaded_pages.pop(id(self), None)
+
+    def populatePage(self):
+        """Add items of page objects saved in document to a new scene."""
+        for obj in self.vp.Object.Group:
+            proxy = getattr(obj.ViewObject, "Proxy", None)
+            if hasattr(proxy, "createItems"):
+                proxy.createItems(obj.ViewObject, self.scene)
+
+    def unloadPage(self):
+        """Close page subwindow and free its scene, showPage populates a
+        new scene from page objects."""
+        for obj in self.vp.Object.Group:
+            proxy = getattr(obj.ViewObject, "Proxy", None)
+            if hasattr(proxy, "releaseItems"):
+                proxy.releaseItems(obj.ViewObject)
+        self.graphics_view.setScene(None)
+        self.hidePage()
+        self.scene.clear()
+        self.scene = None
 
     def __getstate__(self):
         """When saving the document this object gets stored using Python"s json module.\
@@ -245,6 +326,7 @@ class PageCommand:
         Page(page)
         PageView(page.ViewObject)       
         FreeCAD.ActiveDocument.recompute()
+        page.ViewObject.Proxy.showPage()
 
     def GetResources(self):
         return {"Pixmap" : ":/icons/new_page.svg",
@@ -26,8 +26,96 @@
 """
 GraphicsView for page 
 """
-from PySide import QtCore, QtGui, QtSvg
+from math import log, floor, ceil
+from PySide import QtCore, QtGui
 import FreeCAD, FreeCADGui
+from GraphicItem import SIMPLIFY_LOD
+from LRUCache import LRUCache
+from TemplateCache import template_cache
+from Utils import getParam
+
+TILE_SIZE = 256 # tile width and height in device pixels
+# Tiles of all pages by (template, mtime, zoom bucket, column, row)
+template_tiles = LRUCache()
+
+
+def setTemplateCacheLimit(max_bytes=None):
+    """Change memory limit of template tiles cache (TemplateCacheMB 
+    preference by default)."""
+    if max_bytes is None:
+        max_bytes = getParam("TemplateCacheMB", "General")*1024*1024
+    template_tiles.setMaxBytes(max_bytes)
+
+
+class Tile(object):
+    """Rendered template tile (sized by nbytes for LRUCache)."""
+    def __init__(self, pixmap):
+        self.pixmap = pixmap
+        self.nbytes = pixmap.width() * pixmap.height() * 4
+
+
+class TemplateItem(QtGui.QGraphicsItem):
+    """Paper background and svg template drawn from raster tiles. Tiles are
+    rendered once for each zoom bucket (power of 2 of level of detail), so 
+    the template is rendered again only when it or zoom bucket changes."""
+    def __init__(self, template):
+        super(TemplateItem, self).__init__()
+        self.setFlag(QtGui.QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setTemplate(template)
+
+    def setTemplate(self, template):
+        """Load svg template (parsed templates are shared by all pages)."""
+        self.prepareGeometryChange()
+        self.template = template_cache.get(template)
+        self.renderer = self.template.renderer
+        self.rect = QtCore.QRectF(QtCore.QPointF(0, 0), 
+                                  QtCore.QSizeF(self.renderer.defaultSize()))
+        self.update()
+
+    def reloadTemplate(self):
+        """Load template again if its file has changed (called when page is
+        shown, never while painting)."""
+        if template_cache.get(self.template.path) is not self.template:
+            self.setTemplate(self.template.path)
+
+    def boundingRect(self):
+        return self.rect
+
+    def tile(self, bucket, column, row):
+        """Return pixmap of tile (column, row) rendered at scale bucket."""
+        key = self.template.key() + (bucket, column, row)
+        tile = template_tiles.get(key)
+        if tile is None:
+            image = QtGui.QImage(TILE_SIZE, TILE_SIZE, 
+                                 QtGui.QImage.Format_ARGB32_Premultiplied)
+            image.fill(QtCore.Qt.transparent)
+            painter = QtGui.QPainter(image)
+            painter.setRenderHint(QtGui.QPainter.Antialiasing)
+            painter.scale(bucket, bucket)
+            painter.translate(-column*TILE_SIZE/bucket, -row*TILE_SIZE/bucket)
+            painter.fillRect(self.rect, QtGui.QColor(255, 255, 255))
+            self.renderer.render(painter, self.rect)
+            painter.end()
+            tile = Tile(QtGui.QPixmap.fromImage(image))
+            template_tiles.put(key, tile)
+        return tile.pixmap
+
+    def paint(self, painter, option, widget=None):
+        lod = QtGui.QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+            painter.worldTransform())
+        lod = min(max(lod, 1/16.0), 16.0)
+        bucket = 2.0**int(round(log(lod, 2)))
+        size = TILE_SIZE / bucket # tile size in item coordinates
+        exposed = option.exposedRect.intersected(self.rect)
+        source = QtCore.QRectF(0, 0, TILE_SIZE, TILE_SIZE)
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+        for column in range(int(floor(exposed.left()/size)), 
+                            int(ceil(exposed.right()/size))):
+            for row in range(int(floor(exposed.top()/size)), 
+                             int(ceil(exposed.bottom()/size))):
+                target = QtCore.QRectF(column*size, row*size, size, size)
+                painter.drawPixmap(target, self.tile(bucket, column, row), 
+                                   source)
 
 
 class PageScene(QtGui.QGraphicsScene):
@@ -39,20 +127,14 @@ class PageScene(QtGui.QGraphicsScene):
         brush = QtGui.QBrush(QtGui.QColor(100, 100, 100))
         self.setBackgroundBrush(brush)
         self.clear()
-        # Create drawing paper 
-        self.m_svgItem = QtSvg.QGraphicsSvgItem(template)
-        self.m_svgItem.setFlags(QtGui.QGraphicsItem.ItemClipsToShape)
-        self.m_svgItem.setCacheMode(QtGui.QGraphicsItem.NoCache)
+        # Create drawing paper (white background and template)
+        self.m_svgItem = TemplateItem(template)
         self.m_svgItem.setZValue(0)
-        # Create paper background 
-        rect = self.m_svgItem.boundingRect()
-        self.m_backgroundItem = QtGui.QGraphicsRectItem(rect)
-        self.m_backgroundItem.setBrush(QtGui.QColor(255, 255, 255))
-        self.m_backgroundItem.setPen(QtCore.Qt.NoPen)
-        self.m_backgroundItem.setZValue(-1)
-        # Add items
-        self.addItem(self.m_backgroundItem)
         self.addItem(self.m_svgItem)
+
+    def reloadTemplate(self):
+        """Load template again if its file has changed."""
+        self.m_svgItem.reloadTemplate()
         
     def mousePressEvent(self, event):
         """Send mouse press event to command handlers"""
@@ -67,9 +149,15 @@ class PageScene(QtGui.QGraphicsScene):
 
 class PageGraphicsView(QtGui.QGraphicsView):
     """This class handles page graphics view"""
-    def __init__(self, template="/home/gabrielantao/.FreeCAD/Mod/Dimensioning/Resources/templates/A4_Landscape.svg"):
+    def __init__(self, template="/home/gabrielantao/.FreeCAD/Mod/Dimensioning/Resources/templates/A4_Landscape.svg",
+                 scene=None):
         super(PageGraphicsView, self).__init__()
-        self.setScene(PageScene(template))
+        setTemplateCacheLimit() #preference may have changed
+        # NOTE: scene is given when page scene is kept while its subwindow
+        #       is closed (see Page.PageView)
+        if scene is None:
+            scene = PageScene(template)
+        self.setScene(scene)
         self.setTransformationAnchor(QtGui.QGraphicsView.AnchorUnderMouse)
         self.setRenderHint(QtGui.QPainter.Antialiasing)
         self.resetTransform()
@@ -85,6 +173,7 @@ class PageGraphicsView(QtGui.QGraphicsView):
         subwindow.aboutToActivate.connect(setActiveDocument)
         self.show() #https://forum.freecadweb.org/viewtopic.php?t=9892
         self.fitInView(self.scene().sceneRect(), QtCore.Qt.KeepAspectRatio)
+        self.updateLevelOfDetail()
         subwindow.setWindowIcon(QtGui.QIcon(":/icons/window_icon.svg"))
 
     # NOTE: This could be used to build a name just like Drawing WB does...
@@ -113,7 +202,15 @@ class PageGraphicsView(QtGui.QGraphicsView):
         delta = event.delta()
         factor = pow(1.2, delta / 240.0)
         self.scale(factor, factor)
+        self.updateLevelOfDetail()
         event.accept()
+
+    def updateLevelOfDetail(self):
+        """Items draw simplified paths when zoomed out (see 
+        GraphicItem.levelOfDetail), antialiasing is also turned off then."""
+        lod = QtGui.QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+            self.transform())
+        self.setRenderHint(QtGui.QPainter.Antialiasing, lod >= SIMPLIFY_LOD)
         
     def closeEvent(self,event):
         event.ignore() #dont close
@@ -0,0 +1,325 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Compact geometry of projected paths. Segments are stored in NumPy arrays so
+they can be parsed, cached, serialized and sent between processes without 
+creating any Qt object. GraphicItem.createItems turns them into scene items.
+"""
+
+import io
+import numpy as np
+
+# Segment type codes (index in PATH_TYPES)
+LINE, ARC, QUADRATIC, CUBIC, CIRCLE, ELLIPSE = range(6)
+PATH_TYPES = ("line", "arc", "quadratic", "cubic", "circle", "ellipse")
+# Edge class codes (index in EDGE_CLASSES)
+VISIBLE, HIDDEN = range(2)
+EDGE_CLASSES = ("visible", "hidden")
+# Vertices closer than this (millimiters) are merged
+VERTEX_TOLERANCE = 1e-4
+
+
+def arcsToCenter(start, end, params):
+    """Convert svg arcs from endpoint to center parameterization in one 
+    vectorized pass. start and end are (n, 2) arrays of end points and params
+    is a (n, 5) array of (r_x, r_y, rotation, large_arc, sweep). Return a 
+    (n, 6) array of (c_x, c_y, r_x, r_y, start_angle, arc_angle), angles in
+    degrees.
+    https://www.w3.org/TR/SVG/implnote.html#ArcConversionEndpointToCenter
+    """
+    start = np.asarray(start, float).reshape(-1, 2)
+    end = np.asarray(end, float).reshape(-1, 2)
+    params = np.asarray(params, float).reshape(-1, 5)
+    r_x = np.abs(params[:, 0])
+    r_y = np.abs(params[:, 1])
+    phi = np.radians(params[:, 2])
+    f_a = params[:, 3]
+    f_s = params[:, 4]
+    cos, sin = np.cos(phi), np.sin(phi)
+    half = (start - end) / 2
+    middle = (start + end) / 2
+    x_prime = cos*half[:, 0] + sin*half[:, 1]
+    y_prime = -sin*half[:, 0] + cos*half[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # scale up radii too small to reach the end point
+        scale = np.sqrt(np.maximum((x_prime/r_x)**2 + (y_prime/r_y)**2, 1.0))
+        r_x = r_x*scale
+        r_y = r_y*scale
+        dq = (r_x*y_prime)**2 + (r_y*x_prime)**2
+        pq = ((r_x*r_y)**2 - dq)/dq
+        factor = np.where(f_a == f_s, -1.0, 1.0)
+        c_prime = factor*np.sqrt(np.maximum(pq, 0.0)) #max ensure pq >= 0
+        c_x_prime = c_prime*r_x*y_prime/r_y
+        c_y_prime = -c_prime*r_y*x_prime/r_x
+        # unit vectors from center to start and end (ellipse space)
+        u_x = (x_prime - c_x_prime)/r_x
+        u_y = (y_prime - c_y_prime)/r_y
+        v_x = (-x_prime - c_x_prime)/r_x
+        v_y = (-y_prime - c_y_prime)/r_y
+        start_angle = _angleBetween(1.0, 0.0, u_x, u_y)
+        arc_angle = _angleBetween(u_x, u_y, v_x, v_y) % 360
+    arc_angle[(f_s == 0) & (arc_angle > 0)] -= 360
+    return np.column_stack([cos*c_x_prime - sin*c_y_prime + middle[:, 0],
+                            sin*c_x_prime + cos*c_y_prime + middle[:, 1],
+                            r_x, r_y, start_angle, arc_angle])
+
+
+def _angleBetween(u_x, u_y, v_x, v_y):
+    """Signed angle in degrees between arrays of vectors u and v (same as 
+    Geometry2D.angleBetween)."""
+    cosine = (u_x*v_x + u_y*v_y) / (np.hypot(u_x, u_y)*np.hypot(v_x, v_y))
+    factor = np.where(u_x*v_y - u_y*v_x >= 0, 1.0, -1.0)
+    return factor*np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+class PathGeometry(object):
+    """Array-backed list of segments.
+    types: (n,) segment type codes
+    edge_class: (n,) edge class codes
+    points: (n, 4, 2) start, control 1, control 2 and end points. Lines and 
+        arcs repeat start and end as controls, quadratic curves repeat its 
+        control point, circles and ellipses store the center in all of them.
+    params: (n, 5) arc (r_x, r_y, rotation, large_arc, sweep), 
+        circle (r, r, 0, 0, 0) and ellipse (r_x, r_y, rotation, p_x, p_y)
+    vertices: (m, 2) segment end points and centers (see mergeVertices)
+    vertex_rotation: (m, 3) rotation, p_x, p_y (only for ellipse centers)
+    """
+    ARRAYS = ("types", "edge_class", "points", "params", "vertices", 
+              "vertex_rotation")
+
+    def __init__(self, types=None, edge_class=None, points=None, params=None,
+                 vertices=None, vertex_rotation=None):
+        self.types = np.zeros(0, np.uint8) if types is None else types
+        self.edge_class = np.zeros(0, np.uint8) if edge_class is None else edge_class
+        self.points = np.zeros((0, 4, 2)) if points is None else points
+        self.params = np.zeros((0, 5)) if params is None else params
+        self.vertices = np.zeros((0, 2)) if vertices is None else vertices
+        if vertex_rotation is None:
+            vertex_rotation = np.zeros((len(self.vertices), 3))
+        self.vertex_rotation = vertex_rotation
+
+    @classmethod
+    def fromSegments(cls, segments, edge_class=VISIBLE):
+        """Create geometry from SvgParser.iterSegments tuples."""
+        types = []
+        points = []
+        params = []
+        vertices = [] # end points, repeated ones are merged by mergeVertices
+        vertex_rotation = []
+        no_rotation = (0.0, 0.0, 0.0)
+        no_param = (0.0, 0.0, 0.0, 0.0, 0.0)
+        for path_type, start, data in segments:
+            if path_type == "move":
+                vertices.append(start)
+                vertex_rotation.append(no_rotation)
+                continue
+            if path_type == "line":
+                end = data[0]
+                types.append(LINE)
+                points.append((start, start, end, end))
+                params.append(no_param)
+            elif path_type == "arc":
+                end = (data[5], data[6])
+                types.append(ARC)
+                points.append((start, start, end, end))
+                params.append(data[:5])
+            elif path_type == "quadratic":
+                control, end = data
+                types.append(QUADRATIC)
+                points.append((start, control, control, end))
+                params.append(no_param)
+            elif path_type == "cubic":
+                end = data[2]
+                types.append(CUBIC)
+                points.append((start,) + tuple(data))
+                params.append(no_param)
+            elif path_type == "circle":
+                end = data[0]
+                types.append(CIRCLE)
+                points.append((end, end, end, end))
+                params.append((data[1], data[2], 0.0, 0.0, 0.0))
+            elif path_type == "ellipse":
+                end, r_x, r_y, rotation, pivot = data
+                types.append(ELLIPSE)
+                points.append((end, end, end, end))
+                params.append((r_x, r_y, rotation) + tuple(pivot))
+                if rotation:
+                    vertices.append(end)
+                    vertex_rotation.append((rotation,) + tuple(pivot))
+                    continue
+            vertices.append(end)
+            vertex_rotation.append(no_rotation)
+        count = len(types)
+        return cls(np.array(types, np.uint8), 
+                   np.full(count, edge_class, np.uint8),
+                   np.array(points, float).reshape(count, 4, 2),
+                   np.array(params, float).reshape(count, 5),
+                   np.array(vertices, float).reshape(-1, 2),
+                   np.array(vertex_rotation, float).reshape(-1, 3))
+
+    @classmethod
+    def concatenate(cls, geometries):
+        """Join a list of geometries. Repeated vertices are kept (see 
+        mergeVertices)."""
+        geometries = list(geometries)
+        if len(geometries) == 0:
+            return cls()
+        vertices = np.concatenate([g.vertices for g in geometries])
+        vertex_rotation = np.concatenate([g.vertex_rotation for g in geometries])
+        return cls(np.concatenate([g.types for g in geometries]),
+                   np.concatenate([g.edge_class for g in geometries]),
+                   np.concatenate([g.points for g in geometries]),
+                   np.concatenate([g.params for g in geometries]),
+                   vertices, vertex_rotation)
+
+    def mergeVertices(self, tolerance=VERTEX_TOLERANCE):
+        """Return (geometry, merged) where vertices in the same cell of a 
+        grid of tolerance size (np.round of coordinates) are merged, the 
+        first one of each cell is kept, and merged is the number of vertices
+        dropped. Rotated vertices (ellipse centers, their pivot must not 
+        move) are never merged. Segments are shared."""
+        if len(self.vertices) < 2:
+            return (self, 0)
+        rotated = np.any(self.vertex_rotation != 0, axis=1)
+        free = np.flatnonzero(~rotated)
+        keys = np.round(self.vertices[free] / tolerance).astype(np.int64)
+        keys, index = np.unique(keys, axis=0, return_index=True)
+        index = np.concatenate([free[index], np.flatnonzero(rotated)])
+        index.sort() # keep vertices order
+        merged = len(self.vertices) - len(index)
+        if merged == 0:
+            return (self, 0)
+        return (PathGeometry(self.types, self.edge_class, self.points, 
+                             self.params, self.vertices[index], 
+                             self.vertex_rotation[index]), merged)
+
+    def __len__(self):
+        return len(self.types)
+
+    @property
+    def nbytes(self):
+        """Memory used by geometry arrays."""
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def __eq__(self, other):
+        if not isinstance(other, PathGeometry):
+            return False
+        return all(np.array_equal(getattr(self, name), getattr(other, name))
+                   for name in self.ARRAYS)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "PathGeometry({} segments, {} vertices)".format(len(self), 
+                                                               len(self.vertices))
+
+    def select(self, edge_class):
+        """Return a geometry with only segments of edge_class. Vertices are 
+        kept."""
+        mask = self.edge_class == edge_class
+        return PathGeometry(self.types[mask], self.edge_class[mask], 
+                            self.points[mask], self.params[mask], 
+                            self.vertices, self.vertex_rotation)
+
+    def boundingBox(self):
+        """Return (x_min, y_min, x_max, y_max) of all segments."""
+        if len(self) == 0:
+            return (0.0, 0.0, 0.0, 0.0)
+        bounds = self.segmentBounds()
+        lower = bounds[:, :2].min(axis=0)
+        upper = bounds[:, 2:].max(axis=0)
+        return (float(lower[0]), float(lower[1]), float(upper[0]), float(upper[1]))
+
+    def segmentBounds(self):
+        """Return (n, 4) array with x_min, y_min, x_max, y_max of each 
+        segment. Curves are bounded by its control points and arcs by a
+        square around its chord (it may be not tight)."""
+        lower = self.points.min(axis=1)
+        upper = self.points.max(axis=1)
+        arc = self.types == ARC
+        if arc.any():
+            # arc points are at most 2 radius far from chord middle point
+            middle = (self.points[arc, 0] + self.points[arc, 3]) / 2
+            chord = np.hypot(*(self.points[arc, 3] - self.points[arc, 0]).T)
+            radius = np.maximum(self.params[arc, :2].max(axis=1), chord/2)
+            radius = 2 * radius[:, np.newaxis]
+            lower[arc] = np.minimum(lower[arc], middle - radius)
+            upper[arc] = np.maximum(upper[arc], middle + radius)
+        conic = self.types >= CIRCLE
+        if conic.any():
+            radius = self.params[conic, :2].max(axis=1)[:, np.newaxis]
+            lower[conic] -= radius
+            upper[conic] += radius
+        return np.hstack([lower, upper])
+
+    def arcCenters(self):
+        """Return (n, 6) array of arcs center parameterization (c_x, c_y, 
+        r_x, r_y, start_angle, arc_angle) computed for all arcs at once. 
+        Rows of other segments are zeros."""
+        centers = np.zeros((len(self), 6))
+        arc = self.types == ARC
+        if arc.any():
+            centers[arc] = arcsToCenter(self.points[arc, 0], 
+                                        self.points[arc, 3], self.params[arc])
+        return centers
+
+    def iterSegments(self, *index):
+        """Yield (path_type, edge_class, start, data) where data is the same 
+        tuple of SvgParser.iterSegments (points as tuples). Only segments in
+        index are yielded if it is given."""
+        for i in (index or range(len(self))):
+            type_ = self.types[i]
+            points = [tuple(p) for p in self.points[i].tolist()]
+            params = self.params[i].tolist()
+            start = points[0]
+            if type_ == LINE:
+                data = (points[3],)
+            elif type_ == ARC:
+                data = tuple(params) + points[3]
+            elif type_ == QUADRATIC:
+                data = (points[1], points[3])
+            elif type_ == CUBIC:
+                data = tuple(points[1:])
+            elif type_ == CIRCLE:
+                data = (start, params[0], params[1])
+            else:
+                data = (start, params[0], params[1], params[2], 
+                        (params[3], params[4]))
+            yield (PATH_TYPES[type_], EDGE_CLASSES[self.edge_class[i]], 
+                   start, data)
+
+    def toBytes(self):
+        """Serialize geometry into a compressed binary string."""
+        stream = io.BytesIO()
+        np.savez_compressed(stream, **dict((name, getattr(self, name)) 
+                                           for name in self.ARRAYS))
+        return stream.getvalue()
+
+    @classmethod
+    def fromBytes(cls, data):
+        """Create geometry from a string created by toBytes."""
+        arrays = np.load(io.BytesIO(data))
+        return cls(*[arrays[name] for name in cls.ARRAYS])
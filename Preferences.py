@@ -0,0 +1,141 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Cached workbench preferences. Defaults (preferences.json, created by
+Resources/export_preferences.py) are loaded once and values read from
+FreeCAD parameters are kept until the parameter group changes.
+"""
+
+import json
+import os
+import FreeCAD
+from Utils import RGBtoUnsigned, is_str_instance
+
+PREFERENCES_PATH = "User parameter:BaseApp/Preferences/Mod/Dimensioning/"
+DEFAULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "preferences.json")
+
+
+def typedDefault(value):
+    """Convert a default value of preferences.json (strings as exported
+    from .ui files) to bool, int, float, str or color (list of ints)."""
+    if isinstance(value, list): #only color
+        return [int(channel) for channel in value]
+    if not is_str_instance(value):
+        return value
+    if value == "true" or value == "false":
+        return value == "true"
+    for type_ in (int, float):
+        try:
+            return type_(value)
+        except ValueError:
+            pass
+    return value
+
+
+class PreferenceStore(object):
+    """Preferences by group (General, Font...) and name. Values are read
+    from FreeCAD parameters only once, the store observes each parameter
+    group and drops cached values when they change."""
+    def __init__(self, filename=DEFAULTS_FILE):
+        self.filename = filename
+        self.defaults = None # {group: {name: typed default}}
+        self.groups = {} # observed FreeCAD parameter groups by name
+        self.values = {} # (group, name) -> value
+
+    def loadDefaults(self):
+        """Load and convert defaults (only once)."""
+        if self.defaults is None:
+            with open(self.filename, "r") as pref_file:
+                defaults = json.loads(pref_file.read())
+            self.defaults = dict((group, dict((name, typedDefault(value))
+                                              for name, value in params.items()))
+                                 for group, params in defaults.items())
+        return self.defaults
+
+    def getDefault(self, param, group):
+        """Return default value of preference param in group."""
+        return self.loadDefaults()[group][param]
+
+    def getGroup(self, group):
+        """Return FreeCAD parameter group and start observing it."""
+        pref = self.groups.get(group)
+        if pref is None:
+            pref = FreeCAD.ParamGet(PREFERENCES_PATH + group)
+            pref.Attach(self)
+            self.groups[group] = pref
+        return pref
+
+    def get(self, param, group):
+        """Return value of preference param in group."""
+        key = (group, param)
+        if key in self.values:
+            return self.values[key]
+        default = self.getDefault(param, group)
+        pref = self.getGroup(group)
+        if isinstance(default, bool):
+            value = pref.GetBool(param, default)
+        elif isinstance(default, int):
+            value = pref.GetInt(param, default)
+        elif isinstance(default, float):
+            value = pref.GetFloat(param, default)
+        elif isinstance(default, list):
+            value = pref.GetUnsigned(param, RGBtoUnsigned(default))
+        else:
+            value = pref.GetString(param, default)
+        self.values[key] = value
+        return value
+
+    def set(self, param, value, group):
+        """Set value of preference param in group."""
+        pref = self.getGroup(group)
+        if isinstance(value, bool):
+            pref.SetBool(param, value)
+        elif isinstance(value, int):
+            pref.SetInt(param, value)
+        elif is_str_instance(value) and (value == "true" or value == "false"):
+            pref.SetBool(param, value == "true")
+        elif isinstance(value, float):
+            pref.SetFloat(param, value)
+        elif isinstance(value, list): #only color
+            pref.SetUnsigned(param, RGBtoUnsigned(value))
+        else:
+            pref.SetString(param, value)
+        self.invalidate(param)
+
+    def invalidate(self, param=None):
+        """Drop cached values of param (in all groups) or all values."""
+        if param is None:
+            self.values.clear()
+            return
+        for key in [key for key in self.values if key[1] == param]:
+            del self.values[key]
+
+    def onChange(self, pref, param):
+        """FreeCAD parameter group observer."""
+        self.invalidate(param)
+
+
+preferences = PreferenceStore()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Orthographic projection of shapes into PathGeometry. This module doesn't 
+depend on FreeCAD GUI, so views can be projected in worker processes.
+"""
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import FreeCAD
+import Drawing
+
+from SvgParser import parseSvg
+from CurveProjection import brepGeometry
+from PathGeometry import PathGeometry, VISIBLE, HIDDEN
+
+from math import pi as PI
+
+# How selected shapes are joined to be projected
+FUSE = "Fuse" #boolean union of all shapes
+COMPOUND = "Compound" #compound of all shapes
+PARTS = "Parts" #compounds of shapes that overlap in each view
+MODES = (FUSE, COMPOUND, PARTS)
+
+# Edges returned by Drawing.projectEx
+EDGE_NAMES = ("V", "V1", "VN", "VO", "VI", "H", "H1", "HN", "HO", "HI")
+# Edges that can be shown in a view (hard, smooth and contour apparent)
+PROJECTED_EDGES = (0, 1, 3, 5, 6, 8)
+
+def shapeKey(shapes):
+    """Return a key that identifies a list of shapes. Shapes hash code
+    change when a feature is recomputed."""
+    return tuple(sorted(shape.hashCode() for shape in shapes))
+
+def shapeHash(shapes):
+    """Return a hex digest of shapes geometry (BRep data with placement).
+    Unlike shapeKey it is the same when the document is reopened."""
+    digests = []
+    for shape in shapes:
+        data = shape.exportBrepToString()
+        if not isinstance(data, bytes):
+            data = data.encode("utf-8")
+        digests.append(hashlib.sha1(data).hexdigest())
+    return hashlib.sha1("".join(sorted(digests)).encode("ascii")).hexdigest()
+
+def edgeIndexes(show_hidden=False, show_smooth=False):
+    """Return indexes (in EDGE_NAMES) of edges drawn in a view."""
+    edge_visible = [True, show_smooth, False, True, False] 
+    edge_hidden = [show_hidden, show_hidden and show_smooth, False, 
+                   show_hidden, False] 
+    return [i for i, edge in enumerate(edge_visible + edge_hidden) if edge]
+
+def viewMatrix(plane, view_name):
+    """Return the matrix that rotates shape from plane and view name to 
+    front view projected over xy plane (plane change and view rotation in
+    a single matrix, each rotate call is applied after the previous ones)."""
+    matrix = FreeCAD.Base.Matrix()
+    # Change projection plane
+    if plane == "XZ":
+        matrix.rotateX(PI/2)
+        matrix.rotateZ(PI/2)
+    elif plane == "YZ":
+        matrix.rotateY(-PI/2)
+        matrix.rotateZ(-PI/2)
+    # TODO: VERIFICAR A DIREACO CERTA PARA O REAR 
+    #      dependendo vai ser valor de -180° ou 180°
+    # TODO: Acrescentar first angle
+    # Generate required view
+    rotate = {"Front": lambda m: None, 
+              "Rear": lambda m: m.rotateY(PI),
+              "Left": lambda m: m.rotateY(PI/2), 
+              "Right": lambda m: m.rotateY(-PI/2),
+              "Top": lambda m: m.rotateX(PI/2),
+              "Bottom": lambda m: m.rotateX(-PI/2)}
+    rotate[view_name](matrix)
+    return matrix
+
+def placeShape(shape, matrix):
+    """Return shape rotated by matrix without copying its geometry. The
+    shape is put in a compound with matrix as placement, so only a location
+    is set (transformGeometry would copy the whole shape)."""
+    import Part
+    compound = Part.makeCompound([shape])
+    compound.Placement = FreeCAD.Placement(matrix)
+    return compound
+
+def projectView(shape, plane, view_name, direction, edges=PROJECTED_EDGES,
+                native=False):
+    """Project shape and return a dict of PathGeometry by edge index.
+    view_name is view direction (Front, Right, Top...) and direction is
+    where eyes look to. Projection are made always over xy plane 
+    (z direction), shapes are rotated 90° and then projected. 
+    - VISIBLE
+    0 V   hard edge 
+    1 V1  smooth edges 
+    2 VN  contour edges 
+    3 VO  contours apparents 
+    4 VI  isoparametric 
+    
+    - HIDDEN
+    5 H   hard edge 
+    6 H1  smooth edges 
+    7 HN  contour edges 
+    8 HO  contours apparents 
+    9 HI  isoparametric
+
+    If native is True projected edges are converted straight into 
+    PathGeometry (CurveProjection), otherwise (or if they can not be 
+    converted) they are written by Drawing.projectToSVG and parsed.
+    """
+    shape = placeShape(shape, viewMatrix(plane, view_name)) #rotated shape
+    shape_list = Drawing.projectEx(shape, direction)
+    geometries = {}
+    for i in edges:
+        edge_class = VISIBLE if i < 5 else HIDDEN
+        if native:
+            try:
+                geometries[i] = brepGeometry(shape_list[i].exportBrepToString(),
+                                             (direction.x, direction.y, 
+                                              direction.z), edge_class)
+                continue
+            except (NotImplementedError, ValueError, IndexError, 
+                    KeyError) as e:
+                FreeCAD.Console.PrintLog("Native projection of {} failed "
+                                         "({}), using svg.\n".format(
+                                         view_name, e))
+        svg = Drawing.projectToSVG(shape_list[i], direction)
+        geometries[i] = parseSvg(svg, edge_class)
+    return geometries
+
+def mergeProjections(projections):
+    """Join a list of projectView results."""
+    edges = set()
+    for projected in projections:
+        edges.update(projected.keys())
+    return dict((i, PathGeometry.concatenate([p[i] for p in projections 
+                                              if i in p])) 
+                for i in edges)
+
+def fuseShapes(shapes):
+    """Return the union of a list of shapes."""
+    shape = shapes[0]
+    for next_shape in shapes[1:]:
+        shape = shape.fuse(next_shape) #make a union with shapes
+    return shape
+
+def joinShapes(shapes, mode=COMPOUND):
+    """Return a shape to be projected from a list of shapes. Compounds avoid
+    boolean operations and hidden lines are still computed between shapes."""
+    if len(shapes) == 1:
+        return shapes[0]
+    if mode == FUSE:
+        return fuseShapes(shapes)
+    import Part
+    return Part.makeCompound(shapes)
+
+def viewBounds(shape, plane, view_name):
+    """Return (x_min, y_min, x_max, y_max) of shape bound box rotated to 
+    view (before projection over xy plane)."""
+    box = shape.BoundBox
+    corners = [FreeCAD.Vector(x, y, z) for x in (box.XMin, box.XMax) 
+                                       for y in (box.YMin, box.YMax)
+                                       for z in (box.ZMin, box.ZMax)]
+    matrix = viewMatrix(plane, view_name)
+    corners = [matrix.multVec(corner) for corner in corners]
+    return (min(c.x for c in corners), min(c.y for c in corners),
+            max(c.x for c in corners), max(c.y for c in corners))
+
+def groupShapes(shapes, plane, view_name, mode=PARTS, tolerance=1e-3):
+    """Split shapes in groups that must be projected together. In PARTS mode
+    shapes whose bounds overlap in view are grouped (a shape can't hide 
+    lines of another that doesn't overlap it), the other modes return 
+    only one group. Return a list of lists of shape indexes."""
+    if mode != PARTS:
+        return [list(range(len(shapes)))]
+    bounds = [viewBounds(shape, plane, view_name) for shape in shapes]
+    group = list(range(len(shapes))) #union-find parents
+    def root(i):
+        while group[i] != i:
+            group[i] = group[group[i]]
+            i = group[i]
+        return i
+    for i in range(len(shapes)):
+        for j in range(i + 1, len(shapes)):
+            a, b = bounds[i], bounds[j]
+            if a[0] <= b[2] + tolerance and b[0] <= a[2] + tolerance and \
+               a[1] <= b[3] + tolerance and b[1] <= a[3] + tolerance:
+                group[root(j)] = root(i)
+    groups = {}
+    for i in range(len(shapes)):
+        groups.setdefault(root(i), []).append(i)
+    return sorted(groups.values())
+
+def _projectViewJob(args):
+    """Project a view in a worker process. Shapes are sent as BRep strings
+    and geometry is sent back pickled."""
+    breps, mode, plane, view_name, direction = args
+    import Part
+    shapes = []
+    for brep in breps:
+        shape = Part.Shape()
+        shape.importBrepFromString(brep)
+        shapes.append(shape)
+    return projectView(joinShapes(shapes, mode), plane, view_name, 
+                       FreeCAD.Vector(*direction))
+
+# Max time (seconds) to wait for views projected in worker processes (a 
+# worker may die, by a crash in OpenCASCADE, and its result never comes)
+PROJECTION_TIMEOUT = 300
+
+_pool = None
+_executable_lock = threading.Lock()
+
+def pythonExecutable():
+    """Return python interpreter of FreeCAD installation. sys.executable is
+    FreeCAD binary, workers started by it would be FreeCAD instances."""
+    name = "python.exe" if sys.platform == "win32" else "python"
+    candidates = [os.path.join(os.path.dirname(sys.executable), name),
+                  os.path.join(sys.prefix, name),
+                  os.path.join(sys.prefix, "bin", name)]
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        candidates.insert(0, sys.executable)
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+def _startProcess(base, process_obj):
+    """Start process_obj as base process class does, but by python 
+    interpreter of FreeCAD (see pythonExecutable). multiprocessing only has
+    a process-global executable, so it is set just meanwhile and other 
+    multiprocessing users in FreeCAD are not affected."""
+    from multiprocessing import spawn
+    with _executable_lock:
+        previous = spawn.get_executable()
+        spawn.set_executable(pythonExecutable())
+        try:
+            return base._Popen(process_obj)
+        finally:
+            spawn.set_executable(previous)
+
+if hasattr(multiprocessing, "get_context"): #python 3
+    from multiprocessing import context as _context
+
+    # NOTE: processes are pickled to be started, so these classes must be
+    #       defined at module level
+    class SpawnProcess(_context.SpawnProcess):
+        @staticmethod
+        def _Popen(process_obj):
+            return _startProcess(_context.SpawnProcess, process_obj)
+
+    class SpawnContext(_context.SpawnContext):
+        Process = SpawnProcess
+
+    if hasattr(_context, "ForkServerProcess"): #POSIX
+        class ForkServerProcess(_context.ForkServerProcess):
+            @staticmethod
+            def _Popen(process_obj):
+                return _startProcess(_context.ForkServerProcess, process_obj)
+
+        class ForkServerContext(_context.ForkServerContext):
+            Process = ForkServerProcess
+
+def createPool(processes):
+    """Create a worker pool. FreeCAD is a multithreaded GUI process, so 
+    workers are never forked from it: they are forked by a forkserver 
+    (POSIX) or spawned, both run by FreeCAD python interpreter."""
+    executable = pythonExecutable()
+    if executable is None:
+        raise RuntimeError("Python interpreter not found")
+    if not hasattr(multiprocessing, "get_context"): #python 2
+        if sys.platform != "win32":
+            raise RuntimeError("workers would be forked from FreeCAD")
+        multiprocessing.set_executable(executable)
+        return multiprocessing.Pool(processes)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return ForkServerContext().Pool(processes)
+    return SpawnContext().Pool(processes)
+
+def getPool():
+    """Return the worker pool, it is created at first call."""
+    global _pool
+    if _pool is None:
+        _pool = createPool(min(6, multiprocessing.cpu_count()))
+    return _pool
+
+def closePool():
+    """Terminate worker processes (queued projections are dropped)."""
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+
+atexit.register(closePool)
+
+def submitViews(items, mode, plane, direction):
+    """Start projecting views in worker processes. items is a list of 
+    (view name, list of shapes). Return a list of AsyncResult (its get 
+    method returns projectView result) in items order."""
+    breps = {} #each shape is exported only once
+    pool = getPool()
+    results = []
+    for view_name, shapes in items:
+        for shape in shapes:
+            if not (shape.hashCode() in breps):
+                breps[shape.hashCode()] = shape.exportBrepToString()
+        args = ([breps[shape.hashCode()] for shape in shapes], mode, plane, 
+                view_name, tuple(direction))
+        results.append(pool.apply_async(_projectViewJob, (args,)))
+    return results
+
+def projectItems(items, mode, plane, direction, parallel=True):
+    """Project (view name, list of shapes) items. Return a list of 
+    projectView results in items order. Items are projected in worker 
+    processes if parallel is True, serial projection is used if workers 
+    fail."""
+    projections = None
+    if parallel and len(items) > 1:
+        try:
+            results = submitViews(items, mode, plane, direction)
+            deadline = time.time() + PROJECTION_TIMEOUT
+            projections = [result.get(max(0, deadline - time.time())) 
+                           for result in results]
+        except Exception as error:
+            if isinstance(error, multiprocessing.TimeoutError):
+                closePool() #workers may be dead, next call starts new ones
+                error = "timeout"
+            FreeCAD.Console.PrintWarning("Parallel projection failed " + 
+                                         "({}). ".format(error) + 
+                                         "Views will be projected serially.\n")
+    if projections is None:
+        direction = FreeCAD.Vector(*tuple(direction))
+        projections = [projectView(joinShapes(group, mode), plane, name, 
+                                   direction) for name, group in items]
+    return projections
+
+def projectViews(shapes, plane, view_names, direction, parallel=True, 
+                 mode=PARTS):
+    """Project many views of shapes. Return a dict of projectView results by
+    view name (see projectItems)."""
+    items = []
+    for name in view_names:
+        for group in groupShapes(shapes, plane, name, mode):
+            items.append((name, [shapes[i] for i in group]))
+    projections = projectItems(items, mode, plane, direction, parallel)
+    views = {}
+    for (name, group), projected in zip(items, projections):
+        views.setdefault(name, []).append(projected)
+    return dict((name, mergeProjections(views[name])) for name in views)
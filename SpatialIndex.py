@@ -0,0 +1,189 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Uniform grid over vertices and segments of a PathGeometry for snapping.
+Curves are flattened into short chords when the index is built, so nearest
+edge queries only compute point to chord distances of a few grid cells.
+"""
+
+import numpy as np
+from PathGeometry import LINE, ARC, QUADRATIC, CUBIC, CIRCLE, ELLIPSE
+
+# Chords used to flatten each curve
+CURVE_STEPS = 16
+
+
+def flattenGeometry(geometry, steps=CURVE_STEPS):
+    """Return (chords, owner): (k, 2, 2) array of chord end points and (k,)
+    array with index of the geometry segment of each chord."""
+    points = geometry.points
+    params = geometry.params
+    types = geometry.types
+    chords = [np.stack([points[types == LINE, 0],
+                        points[types == LINE, 3]], axis=1)]
+    owner = [np.flatnonzero(types == LINE)]
+    t = np.linspace(0.0, 1.0, steps + 1)
+    curves = []
+    # Bezier curves
+    mask = types == QUADRATIC
+    if mask.any():
+        p = points[mask][:, :, np.newaxis, :]
+        u = t[:, np.newaxis]
+        curves.append((mask, (1-u)**2*p[:, 0] + 2*(1-u)*u*p[:, 1] +
+                             u**2*p[:, 3]))
+    mask = types == CUBIC
+    if mask.any():
+        p = points[mask][:, :, np.newaxis, :]
+        u = t[:, np.newaxis]
+        curves.append((mask, (1-u)**3*p[:, 0] + 3*(1-u)**2*u*p[:, 1] +
+                             3*(1-u)*u**2*p[:, 2] + u**3*p[:, 3]))
+    # Arcs (center parameterization, rotation phi around center)
+    mask = types == ARC
+    if mask.any():
+        arcs = geometry.arcCenters()[mask]
+        angle = np.radians(arcs[:, 4:5] + arcs[:, 5:6]*t)
+        phi = np.radians(params[mask, 2:3])
+        x = arcs[:, 2:3]*np.cos(angle)
+        y = arcs[:, 3:4]*np.sin(angle)
+        curves.append((mask, np.stack([arcs[:, 0:1] + np.cos(phi)*x - np.sin(phi)*y,
+                                       arcs[:, 1:2] + np.sin(phi)*x + np.cos(phi)*y],
+                                      axis=2)))
+    # Circles and ellipses (ellipses are rotated around its pivot)
+    mask = types >= CIRCLE
+    if mask.any():
+        angle = 2*np.pi*t
+        center = points[mask, 0][:, np.newaxis, :]
+        x = center[:, :, 0] + params[mask, 0:1]*np.cos(angle)
+        y = center[:, :, 1] + params[mask, 1:2]*np.sin(angle)
+        rotation = np.where(types[mask] == ELLIPSE, params[mask, 2], 0.0)
+        rotation = np.radians(rotation)[:, np.newaxis]
+        pivot = np.where((types[mask] == ELLIPSE)[:, np.newaxis],
+                         params[mask, 3:5], points[mask, 0])
+        x = x - pivot[:, 0:1]
+        y = y - pivot[:, 1:2]
+        curves.append((mask, np.stack([
+            pivot[:, 0:1] + np.cos(rotation)*x - np.sin(rotation)*y,
+            pivot[:, 1:2] + np.sin(rotation)*x + np.cos(rotation)*y], axis=2)))
+    for mask, polyline in curves:
+        chords.append(np.stack([polyline[:, :-1], polyline[:, 1:]],
+                               axis=2).reshape(-1, 2, 2))
+        owner.append(np.repeat(np.flatnonzero(mask), steps))
+    return (np.concatenate(chords).reshape(-1, 2, 2), np.concatenate(owner))
+
+
+def pointChordDistance(point, chords):
+    """Distance from point (x, y) to each chord of a (k, 2, 2) array."""
+    start = chords[:, 0]
+    vector = chords[:, 1] - start
+    length = (vector**2).sum(axis=1)
+    length[length == 0] = 1.0
+    t = np.clip(((point - start)*vector).sum(axis=1)/length, 0.0, 1.0)
+    nearest = start + t[:, np.newaxis]*vector
+    return np.hypot(*(nearest - point).T)
+
+
+class Grid(object):
+    """Uniform grid of boxes (x_min, y_min, x_max, y_max). Each cell keeps
+    the indices of the boxes touching it."""
+    def __init__(self, boxes, cell_size):
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        lower = np.floor(boxes[:, :2]/self.cell_size).astype(int)
+        upper = np.floor(boxes[:, 2:]/self.cell_size).astype(int)
+        # boxes inside a single cell are grouped at once
+        single = np.flatnonzero((lower == upper).all(axis=1))
+        if len(single):
+            order = single[np.lexsort(lower[single].T[::-1])]
+            cells, first = np.unique(lower[order], axis=0, return_index=True)
+            for cell, index in zip(cells.tolist(), np.split(order, first[1:])):
+                self.cells[tuple(cell)] = index.tolist()
+        for index in np.flatnonzero((lower != upper).any(axis=1)).tolist():
+            for i in range(lower[index, 0], upper[index, 0] + 1):
+                for j in range(lower[index, 1], upper[index, 1] + 1):
+                    self.cells.setdefault((i, j), []).append(index)
+
+    def query(self, x, y, tolerance):
+        """Return array of box indices in cells around (x, y) within
+        tolerance (it may have boxes farther than tolerance)."""
+        size = self.cell_size
+        found = []
+        for i in range(int(np.floor((x - tolerance)/size)),
+                       int(np.floor((x + tolerance)/size)) + 1):
+            for j in range(int(np.floor((y - tolerance)/size)),
+                           int(np.floor((y + tolerance)/size)) + 1):
+                found.extend(self.cells.get((i, j), ()))
+        return np.unique(np.array(found, int))
+
+
+class SpatialIndex(object):
+    """Nearest vertex and nearest edge queries over a PathGeometry.
+    Coordinates and tolerances are in geometry units (millimiters)."""
+    def __init__(self, geometry, cell_size=None):
+        self.geometry = geometry
+        self.chords, self.owner = flattenGeometry(geometry)
+        self.vertices = geometry.vertices
+        boxes = np.hstack([self.chords.min(axis=1), self.chords.max(axis=1)])
+        if cell_size is None:
+            cell_size = self.cellSize(boxes)
+        self.edge_grid = Grid(boxes, cell_size)
+        self.vertex_grid = Grid(np.hstack([self.vertices, self.vertices]),
+                                cell_size)
+
+    def cellSize(self, boxes):
+        """Cell size with about one chord per cell of the bounding box."""
+        if len(boxes) == 0:
+            return 1.0
+        extent = boxes[:, 2:].max(axis=0) - boxes[:, :2].min(axis=0)
+        size = np.sqrt(max(extent[0]*extent[1], 1e-6)/len(boxes))
+        # cells smaller than chords fill the grid with repeated indices
+        chord = np.median(np.maximum(boxes[:, 2] - boxes[:, 0],
+                                     boxes[:, 3] - boxes[:, 1]))
+        return float(max(size, chord, 1e-3))
+
+    def nearestVertex(self, x, y, tolerance):
+        """Return (vertex index, distance) of the nearest vertex to (x, y)
+        within tolerance or None."""
+        candidates = self.vertex_grid.query(x, y, tolerance)
+        if len(candidates) == 0:
+            return None
+        distance = np.hypot(self.vertices[candidates, 0] - x,
+                            self.vertices[candidates, 1] - y)
+        i = np.argmin(distance)
+        if distance[i] > tolerance:
+            return None
+        return (int(candidates[i]), float(distance[i]))
+
+    def nearestEdge(self, x, y, tolerance):
+        """Return (segment index, distance) of the nearest segment to (x, y)
+        within tolerance or None. Distance to curves is measured to its
+        chords."""
+        candidates = self.edge_grid.query(x, y, tolerance)
+        if len(candidates) == 0:
+            return None
+        distance = pointChordDistance(np.array([x, y]), self.chords[candidates])
+        i = np.argmin(distance)
+        if distance[i] > tolerance:
+            return None
+        return (int(self.owner[candidates[i]]), float(distance[i]))
@@ -24,7 +24,8 @@
 #***************************************************************************/
 
 """
-Read a svg generated by Drawing WB projection and convert into Qt paths.
+Read a svg generated by Drawing WB projection and convert into PathGeometry
+(and then into Qt paths).
 
 Note: Unfortunately FreeCAD crashes everytime you try to use xml.dom, so
       here is used only regular expressions to parse the svg string.
@@ -33,81 +34,118 @@ Note: Unfortunately FreeCAD crashes everytime you try to use xml.dom, so
       https://forum.freecadweb.org/viewtopic.php?f=15&t=23380&start=40
 """
 
-from PySide import QtCore
-from GraphicItem import PathItem, VertexItem
 import re
 
+from PathGeometry import PathGeometry, VISIBLE
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+# NOTE: A single pattern matches every element Drawing WB writes, so the svg
+#       string is scanned only once. Alternatives are: path data, ellipse
+#       (optionally wrapped by a rotate group) and circle. Each alternative
+#       starts with a literal character ("d" or "<"), so the regex engine 
+#       skips any other character quickly (the whitespace before d 
+#       attribute is checked by a lookbehind).
+_re_element = re.compile(
+    r"d(?<=\sd)\s*=\s*\"(?P<d>[^\"]*)\""
+    r"|<(?:g\s+transform\s*=\s*\"rotate\((?P<rot>{0}),\s*(?P<px>{0}),\s*(?P<py>{0})\)\"\s*>\s*<)?"
+    r"ellipse\s+cx\s*=\s*\"(?P<ecx>{0})\"\s+cy\s*=\s*\"(?P<ecy>{0})\"\s+"
+    r"rx\s*=\s*\"(?P<rx>{0})\"\s+ry\s*=\s*\"(?P<ry>{0})\""
+    r"|<circle\s+cx\s*=\s*\"(?P<cx>{0})\"\s+cy\s*=\s*\"(?P<cy>{0})\"\s+"
+    r"r\s*=\s*\"(?P<r>{0})\"".format(_NUMBER))
+_re_path_command = re.compile(r"([MmLlHhVvAaQqTtCcSsZz])([^MmLlHhVvAaQqTtCcSsZz]*)")
+
+# Number of coordinates taken by each implemented path command
+_ARITY = {"M": 2, "L": 2, "A": 7, "Q": 4, "C": 6}
+_PATH_TYPE = {"L": "line", "A": "arc", "Q": "quadratic", "C": "cubic"}
+
+
+def _splitCommand(command, args):
+    """Return a list of (command, coordinates) for one command of path data.
+    Coordinates following a command are split by the command arity, so 
+    implicit repeated commands are returned one by one."""
+    if not (command in _ARITY):
+        raise NotImplementedError("{} command not implemented".format(command))
+    coord = list(map(float, args.replace(",", " ").split()))
+    arity = _ARITY[command]
+    if len(coord) == arity: #usual case, one command per segment
+        return [(command, coord)]
+    if len(coord) == 0 or len(coord) % arity:
+        raise ValueError("Wrong number of coordinates for {} command".format(command))
+    commands = []
+    for i in range(0, len(coord), arity):
+        commands.append((command, coord[i:i+arity]))
+        if command == "M": #implicit commands after moveto are lineto
+            command, arity = "L", 2
+    return commands
+
+
+def tokenizePath(data):
+    """Yield (command, coordinates) from a path data (d attribute) string."""
+    for command, args in _re_path_command.findall(data):
+        for token in _splitCommand(command, args):
+            yield token
+
+
+def iterSegments(svg):
+    """Scan the svg string once and yield segments in document order.
+    Each segment is a tuple (path_type, start, data) where start is a (x, y)
+    tuple and data holds the same values PathItem expects (points as tuples):
+    - move: ()  (only the point, no path is drawn)
+    - line: (end,)
+    - arc: (r_x, r_y, rotation, large_arc, sweep, x, y)
+    - quadratic: (control, end)
+    - cubic: (control_1, control_2, end)
+    - circle: (center, r, r)
+    - ellipse: (center, r_x, r_y, rotation, pivot)
+    """
+    for match in _re_element.finditer(svg):
+        data, rot, p_x, p_y, e_x, e_y, r_x, r_y, c_x, c_y, r = match.groups()
+        if data is not None:
+            current_point = None
+            for command, coord in tokenizePath(data):
+                if command == "M":
+                    current_point = (coord[0], coord[1])
+                    yield ("move", current_point, ())
+                    continue
+                if current_point is None:
+                    raise ValueError("Path data must start with a moveto command")
+                if command == "L":
+                    end = (coord[0], coord[1])
+                    yield ("line", current_point, (end,))
+                elif command == "A":
+                    end = (coord[5], coord[6])
+                    yield ("arc", current_point, tuple(coord))
+                else:
+                    points = tuple(zip(coord[::2], coord[1::2]))
+                    end = points[-1]
+                    yield (_PATH_TYPE[command], current_point, points)
+                current_point = end
+        elif r is not None:
+            center = (float(c_x), float(c_y))
+            yield ("circle", center, (center, float(r), float(r)))
+        else:
+            center = (float(e_x), float(e_y))
+            if rot is not None:
+                rotation = float(rot)
+                pivot = (float(p_x), float(p_y))
+            else:
+                rotation = 0.0
+                pivot = center
+            yield ("ellipse", center, (center, float(r_x), float(r_y), 
+                                       rotation, pivot))
+
+
+def parseSvg(svg, edge_class=VISIBLE):
+    """Convert a svg string into a PathGeometry."""
+    return PathGeometry.fromSegments(iterSegments(svg), edge_class)
+
+
 def svgParser(svg):
-    re_path = re.finditer(r"\sd=\"([\-|\w|\s|\.|\,]*)\"", svg)
-    re_circle = re.finditer(r"cx ={0} cy ={0} r ={0}".format(r"\"([\-|\d|\.]*)\""), svg)
-    re_ellipse = re.finditer(r"<g transform = \"rotate\({0},{0},{0}\)\">\s*" + \
-                             r"<ellipse cx =\"{0}\" cy =\"{0}\" rx =\"{0}\"" + \
-                             r"  ry =\"{0}\"/>".format(r"([\-|\d|\.]*)"), svg)
-    vertices = set()
-    paths = []
-    if svg.strip() == "":
-        return (paths, vertices) #avoid ExpatError    
-    for attr in re_path:
-        attr = attr.groups()[0]
-        list_ = re.split("([M|m|L|l|H|h|V|v|A|a|Q|q|T|t|C|c|S|s])", attr)[1:]
-        for i in range(0, len(list_), 2):
-            type_ = list_[i].strip()
-            if type_ == "M":
-                x, y = map(float, re.split("[,|\s]", list_[i+1].strip()))
-                current_point = QtCore.QPointF(x, y)
-#            elif type_ == "m":
-#                x, y = map(float, moveto.match(list_[i+1]).groups())
-#                current_point += QtCore.QPointF(x, y) 
-            elif type_ == "L":
-                x, y = map(float, re.split("[,|\s]", list_[i+1].strip()))
-                new_point = QtCore.QPointF(x, y)
-                paths.append(PathItem("line", current_point, new_point))
-                current_point = QtCore.QPointF(x, y)
-#            elif type_ == "l":
-#                x, y = map(float, moveto.match(list_[i+1]).groups())
-#                new_point = current_point + QtCore.QPointF(x, y)
-#                paths.append(PathItem("line", current_point, new_point))
-#                current_point += QtCore.QPointF(x, y) 
-            elif type_ == "H":
-                raise NotImplementedError("H command not implemented")
-            elif type_ == "V":
-                raise NotImplementedError("V command not implemented")
-            elif type_ == "A":
-                coord = map(float, re.split("[,|\s]", list_[i+1].strip()))
-                paths.append(PathItem("arc", current_point, *coord))                         
-                current_point = QtCore.QPointF(coord[5], coord[6])
-            elif type_ == "Q":
-                points = []
-                coord = map(float, re.split("[,|\s]", list_[i+1].strip()))
-                for i in range(0, len(coord), 2):
-                    x, y = coord[i:i+2]
-                    points.append(QtCore.QPointF(x, y))                    
-                paths.append(PathItem("quadratic", current_point, *points))                         
-                current_point = QtCore.QPointF(x, y) 
-            elif type_ == "T":
-                raise NotImplementedError("T command not implemented")
-            elif type_ == "C":
-                points = []
-                coord = map(float, re.split("[,|\s]", list_[i+1].strip()))
-                for i in range(0, len(coord), 2):
-                    x, y = coord[i:i+2]
-                    points.append(QtCore.QPointF(x, y))                    
-                paths.append(PathItem("cubic", current_point, *points))                         
-                current_point = QtCore.QPointF(x, y) 
-            elif type_ == "S":
-                raise NotImplementedError("S command not implemented")
-            vertices.add(VertexItem(current_point))
-    for attr in re_circle:
-        c_x, c_y, r = map(float, attr.groups()) 
-        current_point = QtCore.QPointF(c_x, c_y) #center
-        points = [current_point, r, r] 
-        paths.append(PathItem("circle", current_point, *points)) 
-        vertices.add(VertexItem(current_point))
-    for attr in re_ellipse:
-        rot, p_x, p_y, c_x, c_y, r_x, r_y = map(float, attr.groups()) 
-        pivot = QtCore.QPointF(p_x, p_y)
-        points = [QtCore.QPointF(c_x, c_y), r_x, r_y, rot, pivot]
-        paths.append(PathItem("ellipse", current_point, *points)) 
-        vertices.add(VertexItem(current_point, [rot, pivot]))
-    # TODO: converter vertices para lista?
-    return (paths, vertices)
\ No newline at end of file
+    """Convert a svg string into a list of PathItem and a list of VertexItem."""
+    # NOTE: Qt is imported here so the parser above can be used (and 
+    #       benchmarked) without a running FreeCAD GUI.
+    from GraphicItem import createItems
+    geometry, merged = parseSvg(svg).mergeVertices()
+    paths, vertices = createItems(geometry)
+    return (paths["visible"], vertices)
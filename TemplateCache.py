@@ -0,0 +1,143 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+#***************************************************************************
+#*   Copyright (c) 2019 Gabriel Antao <gabrielantao@poli.ufrj.br>          *
+#*                                                                         *
+#*   This file is part of the FreeCAD CAx development system.              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   FreeCAD is distributed in the hope that it will be useful,            *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Lesser General Public License for more details.                   *
+#*                                                                         *
+#*   You should have received a copy of the GNU General Public License     *
+#*   along with Dimensioning FreeCAD Workbench.                            *
+#*   If not, see <https://www.gnu.org/licenses/>                           *
+#*                                                                         *
+#***************************************************************************/
+"""
+Parsed svg templates shared by all pages. Each template file is read and
+parsed once (while its modification time doesn't change).
+"""
+
+import os
+import re
+from collections import OrderedDict
+from xml.etree import ElementTree
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+FREECAD_NAMESPACE = "{http://www.freecadweb.org/wiki/index.php?title=Svg_Namespace}"
+# ISO 216 paper sizes in millimiters (short side, long side)
+PAPER_SIZES = OrderedDict([("A0", (841, 1189)), ("A1", (594, 841)),
+                           ("A2", (420, 594)), ("A3", (297, 420)),
+                           ("A4", (210, 297)), ("A5", (148, 210))])
+
+_re_length = re.compile(r"\s*([-+]?[0-9]*\.?[0-9]+)\s*(mm|cm|in|px)?")
+_re_working_space = re.compile(r"<!--\s*Working space\s+([-\d.\s]+?)\s*-->")
+_UNITS = {"mm": 1.0, "cm": 10.0, "in": 25.4, "px": 25.4/90.0, None: 1.0}
+
+
+def parseLength(value):
+    """Convert a svg length ("297mm", "11in"...) into millimiters. Lengths
+    without unit are taken as millimiters (as FreeCAD templates viewBox)."""
+    match = _re_length.match(value or "")
+    if match is None:
+        return 0.0
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def readTemplateInfo(data):
+    """Return metadata of template svg string data as a dict with width,
+    height (millimiters), paper_size (A0...A5 or ""), orientation, margins
+    (top, bottom, left, right or None) and fields (editable title block
+    texts by name)."""
+    root = ElementTree.fromstring(data)
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    width = parseLength(root.get("width"))
+    height = parseLength(root.get("height"))
+    orientation = "landscape" if width > height else "portrait"
+    paper_size = ""
+    for name, (short, long_) in PAPER_SIZES.items():
+        if abs(min(width, height) - short) < 1 and abs(max(width, height) - long_) < 1:
+            paper_size = name
+            break
+    # Margins from working space comment or drawing border of FreeCAD templates
+    margins = None
+    match = _re_working_space.search(data)
+    if match:
+        x_1, y_1, x_2, y_2 = [float(v) for v in match.group(1).split()[:4]]
+        margins = (y_1, height - y_2, x_1, width - x_2)
+    else:
+        for rect in root.iter(SVG_NAMESPACE + "rect"):
+            if rect.get("id") == "drawing-border":
+                x, y = parseLength(rect.get("x")), parseLength(rect.get("y"))
+                w, h = parseLength(rect.get("width")), parseLength(rect.get("height"))
+                margins = (y, height - y - h, x, width - x - w)
+                break
+    fields = OrderedDict()
+    for text in root.iter(SVG_NAMESPACE + "text"):
+        name = text.get(FREECAD_NAMESPACE + "editable")
+        if name is not None:
+            fields[name] = "".join(text.itertext())
+    return {"width": width, "height": height, "paper_size": paper_size,
+            "orientation": orientation, "margins": margins, "fields": fields}
+
+
+class Template(object):
+    """Parsed template: svg renderer and metadata (see readTemplateInfo)."""
+    def __init__(self, path, mtime, data):
+        from PySide import QtCore, QtSvg
+        self.path = path
+        self.mtime = mtime
+        self.renderer = QtSvg.QSvgRenderer(QtCore.QByteArray(data))
+        try:
+            info = readTemplateInfo(data)
+        except ElementTree.ParseError:
+            info = readTemplateInfo("<svg/>")
+        for name, value in info.items():
+            setattr(self, name, value)
+
+    def key(self):
+        return (self.path, self.mtime)
+
+
+class TemplateCache(object):
+    """Templates by absolute path. A template is parsed again only if its
+    file modification time changes."""
+    def __init__(self):
+        self._templates = {}
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, path):
+        """Return Template of file path."""
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path) if os.path.isfile(path) else 0
+        template = self._templates.get(path)
+        if template is None or template.mtime != mtime:
+            data = b""
+            if mtime:
+                with open(path, "rb") as svg_file:
+                    data = svg_file.read()
+            template = Template(path, mtime, data)
+            self._templates[path] = template
+        return template
+
+    def discard(self, path):
+        """Remove template of path from cache."""
+        self._templates.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        self._templates.clear()
+
+
+template_cache = TemplateCache()
@@ -27,14 +27,13 @@
 Convinience functions.
 """
 
-from math import sin, cos, radians, degrees  
-import numpy as np
+from math import sin, cos, radians
 
-import json
 import FreeCAD, FreeCADGui
 from sys import version_info
 
 from PySide import QtCore, QtGui, QtUiTools
+from Geometry2D import MM_TO_PX
 
 # This is necessary for compatibility reasons
 if version_info[0] == 2:
@@ -54,51 +53,21 @@ def unsignedtoRGB(value):
     return [red, green, blue] 
 
 def getParam(param, path):
-    """Get default preference"""
-    path = "User parameter:BaseApp/Preferences/Mod/Dimensioning/".format(path)
-    pref = FreeCAD.ParamGet(path)
-    with open("preferences.json", "r") as pref_file:
-        default = json.loads(pref_file.read())[path][param]
-    if isinstance(default, int):
-        return pref.GetInt(param, default)
-    elif is_str_instance(default): #str is always unicode here
-        if default == "true" or default == "false":
-            return pref.GetBool(param, default)
-        return pref.GetString(param, default)
-    elif isinstance(default, float):
-        return pref.GetFloat(param, default)
-    elif isinstance(default, list): #only color
-        return pref.GetUnsigned(param, RGBtoUnsigned(default))
+    """Get preference param of group path (General, Font...). Values are 
+    cached by Preferences.preferences."""
+    from Preferences import preferences
+    return preferences.get(param, path)
 
 def setParam(param, value, path):
-    """Set default preference"""
-    path = "User parameter:BaseApp/Preferences/Mod/Dimensioning/".format(path)
-    pref = FreeCAD.ParamGet(path)
-    if isinstance(value, int):
-        pref.SetInt(param, value)
-    elif is_str_instance(value): #str is always unicode here
-        if value == "true" or value == "false":
-            pref.SetBool(param, value)
-        else:
-            pref.SetString(param, value)
-    elif isinstance(value, float):
-        pref.SetFloat(param, value)
-    elif isinstance(value, list): #only color
-        pref.SetUnsigned(param, RGBtoUnsigned(value))
-    elif isinstance(value, bool):
-        if value:
-            pref.SetBool(param, "true")
-        else:
-            pref.SetBool(param, "false")
+    """Set preference param of group path (General, Font...)."""
+    from Preferences import preferences
+    preferences.set(param, value, path)
         
 def mmtopx(value):
     """Convert dimension in millimiter into pixel"""
-    DPI = 90.0 #Inkscape default
     if isinstance(value, QtCore.QPointF):
-        x = value.x() * DPI / 25.4
-        y = value.y() * DPI / 25.4
-        return QtCore.QPointF(x, y)
-    return value * DPI / 25.4 # 1 in -> 25.4 mm 
+        return QtCore.QPointF(value.x() * MM_TO_PX, value.y() * MM_TO_PX)
+    return value * MM_TO_PX
 
 def mmtopt(value):
     """Convert dimension in millimiters to pt (font point)"""
@@ -137,12 +106,3 @@ def rotate(vector, angle):
     return QtCore.QPointF( v_x*cos(angle) + v_y*sin(angle),
                           -v_x*sin(angle) + v_y*cos(angle))
 
-def angleBetween(vector_1, vector_2):
-    """Calculate the angle between two numpy column arrays in degrees.
-    https://www.w3.org/TR/SVG/implnote.html#ArcConversionEndpointToCenter
-    """
-    num = np.vdot(vector_1, vector_2) #dot product
-    num /= np.linalg.norm(vector_1) * np.linalg.norm(vector_2)
-    factor = np.linalg.det(np.concatenate([vector_1, vector_2], axis=1).T)
-    factor = 1 if factor >= 0 else -1
-    return factor*degrees(np.arccos(num))